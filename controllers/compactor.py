@@ -0,0 +1,55 @@
+from models.crud import Crud
+
+
+class Compactor:
+    """Физическая очистка помеченных удалёнными игроков в фоновом потоке.
+
+    После удаления и при открытии источника очистка запускается сразу, если
+    помеченных больше порога Crud, иначе - когда хранилище IDLE_DELAY_MS не
+    получало запросов.
+    """
+
+    IDLE_DELAY_MS = 30000
+
+    def __init__(self, controller):
+        self.controller = controller
+        self.timer = None
+
+    def check(self):
+        self.controller.submit("compaction_check", self.state, callback=self.checked)
+
+    @staticmethod
+    def state() -> tuple:
+        """(помеченных строк, нужна ли очистка сразу); в фоновом потоке"""
+        return Crud.tombstone_count(), Crud.needs_compaction()
+
+    def checked(self, state: tuple):
+        tombstones, needed = state
+        if needed:
+            self.run()
+        elif tombstones:
+            self.arm()
+
+    def touch(self):
+        """Обращение к хранилищу откладывает очистку по простою"""
+        if self.timer is not None:
+            self.arm()
+
+    def arm(self):
+        self.disarm()
+        self.timer = self.controller.worker.schedule(self.IDLE_DELAY_MS, self.run)
+
+    def disarm(self):
+        if self.timer is not None:
+            self.controller.worker.unschedule(self.timer)
+            self.timer = None
+
+    def run(self):
+        self.timer = None
+        # Порции очистки чередуются с чтениями, как при удалении
+        self.controller.submit_chunks(Crud.compact_chunks(), callback=self.compacted)
+
+    def compacted(self, progress):
+        # В XML после перезаписи сдвигаются номера записей на странице
+        if progress.deleted and Crud.data_source != "db":
+            self.controller.refresh_page()
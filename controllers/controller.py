@@ -1,61 +1,168 @@
-from models.crud import Crud
+from collections import namedtuple
+from controllers.compactor import Compactor
+from controllers.page_diff import diff_pages
+from controllers.pagination import KeysetPaginator
+from controllers.worker import ImmediateWorker
+from models.crud import Crud, DeleteProgress
+from models.instrumentation import instrumentation
 from models.xml_adapter import XMLAdapter
-from models.database import TeamType, PlayerPosition
+from models.bin_adapter import BinAdapter
+from models.database import TeamType, PlayerPosition, engine
 from datetime import date
 
+# Результат фонового чтения страницы
+PageData = namedtuple("PageData", "page total_pages total_records players")
+
 
 class Controller:
-    def __init__(self, view):
+    def __init__(self, view, worker=None):
         self.view = view
+        self.worker = worker or ImmediateWorker()
         self.current_page = 1
         self.records_per_page = 10
-        self.all_players = []
+        self.page_players = []
+        self.total_records = 0
+        self.paginator = KeysetPaginator()
+        # Номер версии данных: растёт при каждой записи или смене источника
+        self.data_version = 0
+        # (версия данных, записей на странице), для которых сброшен paginator
+        self.paginator_state = None
+        self.compactor = Compactor(self)
+
+    def submit(self, key, func, *args, callback=None, **kwargs):
+        self.compactor.touch()
+        return self.worker.submit(
+            key, func, *args, callback=callback, errback=self.show_error, **kwargs
+        )
+
+    def submit_write(self, func, *args, callback=None, **kwargs):
+        """Запись в фоне: не вытесняется, а все последующие чтения видят новую версию.
+
+        Задачи выполняются по порядку, поэтому страницы, запрошенные после
+        отправки записи, читаются уже после неё.
+        """
+        self.data_version += 1
+        return self.submit(None, func, *args, callback=callback, **kwargs)
+
+    def show_error(self, error):
+        self.view.open_error_window(str(error))
 
     def load_data(self):
-        self.all_players = Crud.get_data()
-        total_pages = self.calculate_total_pages()
-        if self.current_page > total_pages:
-            self.current_page = total_pages
+        self.data_version += 1
         self.update_view()
+        self.compactor.check()
+
+    def read_page(self, page: int, records_per_page: int, data_version: int):
+        """Выполняется в фоновом потоке"""
+        total_records = Crud.count()
+        if self.paginator_state != (data_version, records_per_page):
+            self.paginator.reset(total_records, records_per_page)
+            self.paginator_state = (data_version, records_per_page)
+        total_pages = self.paginator.total_pages()
+        page = min(page, total_pages)
+        return PageData(page, total_pages, total_records, self.paginator.fetch(page))
+
+    def request_page(self, callback):
+        # Новый запрос страницы вытесняет ещё не показанный предыдущий
+        self.submit(
+            "page",
+            self.read_page,
+            self.current_page,
+            self.records_per_page,
+            self.data_version,
+            callback=callback,
+        )
+
+    def refresh_page(self):
+        """Перечитывает текущую страницу после записи и передаёт виду только разницу.
+
+        Общее количество берётся из кэша Crud, который сдвигается при
+        добавлении и удалении, поэтому повторного COUNT(*) нет.
+        """
+        self.request_page(self.show_page_diff)
+
+    def show_page_diff(self, data: PageData):
+        old_players = self.page_players
+        self.accept_page(data)
+        self.view.apply_page_diff(
+            diff_pages(old_players, data.players),
+            players=data.players,
+            current_page=data.page,
+            total_pages=data.total_pages,
+            total_records=data.total_records,
+        )
+
+    def show_page(self, data: PageData):
+        self.accept_page(data)
+        self.view.update_table(
+            players=data.players,
+            current_page=data.page,
+            total_pages=data.total_pages,
+            total_records=data.total_records,
+        )
+
+    def accept_page(self, data: PageData):
+        self.current_page = data.page
+        self.total_records = data.total_records
+        self.page_players = data.players
 
     def change_data_source(self, source: str):
         if source == "db":
-            Crud.set_data_source("db")
             self.current_page = 1
-            self.load_data()
+            self.submit_write(
+                Crud.set_data_source, "db", callback=lambda _: self.load_data()
+            )
         elif source == "xml":
             default_path = XMLAdapter().xml_file
             self.change_xml_file(str(default_path))
+        elif source == "bin":
+            default_path = BinAdapter().bin_file
+            self.change_bin_file(str(default_path))
 
     def change_xml_file(self, file_path: str):
         if file_path:
-            Crud.change_xml_file(file_path)
-            Crud.set_data_source("xml")
             self.current_page = 1
-            self.load_data()
+            self.submit_write(
+                self.switch_to_xml, file_path, callback=lambda _: self.load_data()
+            )
 
-    def update_view(self):
-        total_pages = self.calculate_total_pages()
-        page_players = self.get_current_page_data()
-        self.view.update_table(
-            players=page_players,
-            current_page=self.current_page,
-            total_pages=total_pages,
-            total_records=len(self.all_players),
+    @staticmethod
+    def switch_to_xml(file_path: str):
+        Crud.change_xml_file(file_path)
+        Crud.set_data_source("xml")
+
+    def change_bin_file(self, file_path: str):
+        if file_path:
+            self.current_page = 1
+            self.submit_write(
+                self.switch_to_bin, file_path, callback=lambda _: self.load_data()
+            )
+
+    @staticmethod
+    def switch_to_bin(file_path: str):
+        Crud.change_bin_file(file_path)
+        Crud.set_data_source("bin")
+
+    def export_data(self, target: str, file_path: str = None):
+        """Копирование игроков текущего источника в другой в фоне"""
+        self.submit(
+            None,
+            Crud.export_to,
+            target,
+            file_path,
+            callback=lambda count: self.view.open_info_window(
+                f"Скопировано {count} игроков"
+            ),
         )
 
+    def update_view(self):
+        self.request_page(self.show_page)
+
     def calculate_total_pages(self):
         return max(
-            1,
-            (len(self.all_players) + self.records_per_page - 1)
-            // self.records_per_page,
+            1, (self.total_records + self.records_per_page - 1) // self.records_per_page
         )
 
-    def get_current_page_data(self):
-        start = (self.current_page - 1) * self.records_per_page
-        end = start + self.records_per_page
-        return self.all_players[start:end]
-
     def change_page(self, page: int):
         if 1 <= page <= self.calculate_total_pages():
             self.current_page = page
@@ -132,52 +239,102 @@ class Controller:
             self.view.open_error_window("\n".join(errors))
             return
 
-        Crud.add_data(
+        self.submit_write(
+            Crud.add_data,
             full_name=full_name,
             birth_date=birth_date,
             football_team=football_team,
             home_city=home_city,
             team_type=TeamType(team_type),
             position=PlayerPosition(position),
+            callback=lambda _: self.refresh_page(),
         )
-        self.load_data()
 
-    def search_by_name_birth(self, name_part=None, birth_date=None):
+    def name_birth_criteria(self, name_part=None, birth_date=None):
         name_part = name_part.strip() if name_part else None
-        return Crud.search_by_name_or_birth(name_part, birth_date)
+        return {"name_part": name_part, "birth_date": birth_date}
 
-    def search_by_position_team_type(self, position=None, team_type=None):
+    def position_team_type_criteria(self, position=None, team_type=None):
         position = position.strip() if position else None
         team_type = team_type.strip() if team_type else None
-        return Crud.search_by_position_or_team_type(
-            PlayerPosition(position) if position else None,
-            TeamType(team_type) if team_type else None,
-        )
+        return {
+            "position": PlayerPosition(position) if position else None,
+            "team_type": TeamType(team_type) if team_type else None,
+        }
 
-    def search_by_team_city(self, team=None, city=None):
+    def team_city_criteria(self, team=None, city=None):
         team = team.strip() if team else None
         city = city.strip() if city else None
-        return Crud.search_by_team_or_city(team, city)
+        return {"team": team, "city": city}
 
-    def delete_by_name_birth(self, name_part=None, birth_date=None):
-        name_part = name_part.strip() if name_part else None
-        deleted_count = Crud.delete_by_name_or_birth(name_part, birth_date)
-        self.handle_deletion_result(deleted_count)
+    def search(self, criteria, callback):
+        """Поиск в фоне; результат придёт в callback, устаревший поиск отменяется"""
+        return self.submit("search", Crud.search, criteria, callback=callback)
 
-    def delete_by_position_team_type(self, position=None, team_type=None):
-        position = position.strip() if position else None
-        team_type = team_type.strip() if team_type else None
-        deleted_count = Crud.delete_by_position_or_team_type(
-            PlayerPosition(position) if position else None,
-            TeamType(team_type) if team_type else None,
+    def load_stats(self, callback):
+        return self.submit("stats", Crud.stats, callback=callback)
+
+    def set_instrumentation(self, enabled: bool):
+        if enabled:
+            instrumentation.install(engine)
+        else:
+            instrumentation.uninstall()
+
+    def reset_diagnostics(self):
+        instrumentation.reset()
+
+    def diagnostics_report(self) -> dict:
+        report = instrumentation.report()
+        report["query_cache"] = Crud.query_cache_stats()
+        return report
+
+    def dump_diagnostics(self, path: str):
+        instrumentation.dump(path, {"query_cache": Crud.query_cache_stats()})
+
+    def cancel_search(self):
+        self.worker.cancel("search")
+
+    def preview_deletion(self, criteria, callback):
+        """Количество и примеры удаляемых игроков для подтверждения"""
+        return self.submit(
+            "delete_preview", Crud.preview_delete, criteria, callback=callback
         )
-        self.handle_deletion_result(deleted_count)
 
-    def delete_by_team_city(self, team=None, city=None):
-        team = team.strip() if team else None
-        city = city.strip() if city else None
-        deleted_count = Crud.delete_by_team_or_city(team, city)
-        self.handle_deletion_result(deleted_count)
+    def delete_players(self, criteria, on_progress=None):
+        """Удаление порциями: каждая порция - отдельная задача фонового потока.
+
+        Чтения, отправленные во время удаления, выполняются между порциями,
+        а on_progress получает DeleteProgress после каждой из них.
+        """
+        self.submit_chunks(
+            Crud.delete_chunks(criteria),
+            on_step=on_progress,
+            callback=lambda progress: self.handle_deletion_result(progress.deleted),
+        )
+
+    def submit_chunks(self, chunks, on_step=None, callback=None):
+        """Записи порциями: каждый шаг генератора chunks - отдельная задача
+        фонового потока, следующая отправляется после завершения предыдущей.
+
+        on_step получает каждый шаг, callback - последний DeleteProgress.
+        """
+        progress = DeleteProgress(0, 0.0)
+
+        def run_next():
+            self.submit_write(next, chunks, None, callback=chunk_done)
+
+        def chunk_done(step):
+            nonlocal progress
+            if step is None:
+                if callback:
+                    callback(progress)
+                return
+            progress = step
+            if on_step:
+                on_step(step)
+            run_next()
+
+        run_next()
 
     def handle_deletion_result(self, deleted_count):
         if deleted_count > 0:
@@ -185,4 +342,7 @@ class Controller:
         else:
             message = "Игроки не найдены"
         self.view.open_deleted_count_window(message)
-        self.load_data()
+        if deleted_count > 0:
+            self.refresh_page()
+            if Crud.soft_delete:
+                self.compactor.check()
@@ -0,0 +1,66 @@
+from collections import OrderedDict
+from models.filters import PlayerFilter
+
+
+class LiveSearchController:
+    """Поиск по мере ввода с кэшем результатов.
+
+    Если новый запрос только уточняет один из закэшированных (к части ФИО
+    дописаны символы, префикс команды или города удлинился), результат
+    получается фильтрацией в памяти без обращения к хранилищу.
+    """
+
+    MAX_CACHED_QUERIES = 32
+
+    def __init__(self, controller):
+        self.controller = controller
+        self.cache = OrderedDict()
+        self.data_version = controller.data_version
+
+    def player_filter(self, name_part=None, team=None, city=None) -> PlayerFilter:
+        criteria = {
+            **self.controller.name_birth_criteria(name_part),
+            **self.controller.team_city_criteria(team, city),
+        }
+        return PlayerFilter.from_criteria(criteria)
+
+    def cached(self, player_filter: PlayerFilter):
+        """Результат из кэша или уточнение закэшированного; None - нужен запрос"""
+        if self.data_version != self.controller.data_version:
+            # После записи закэшированные выборки устарели
+            self.cache.clear()
+            self.data_version = self.controller.data_version
+
+        if player_filter in self.cache:
+            self.cache.move_to_end(player_filter)
+            return self.cache[player_filter]
+
+        # Самые свежие выборки обычно и самые узкие
+        for cached_filter, players in reversed(self.cache.items()):
+            if player_filter.refines(cached_filter):
+                refined = [
+                    player for player in players if player_filter.matches(player)
+                ]
+                self.remember(player_filter, refined)
+                return refined
+        return None
+
+    def remember(self, player_filter: PlayerFilter, players):
+        self.cache[player_filter] = players
+        self.cache.move_to_end(player_filter)
+        if len(self.cache) > self.MAX_CACHED_QUERIES:
+            self.cache.popitem(last=False)
+
+    def search(self, player_filter: PlayerFilter, callback):
+        """Запрос к хранилищу в фоне; предыдущий незавершённый запрос отменяется"""
+        data_version = self.controller.data_version
+
+        def done(players):
+            if data_version == self.controller.data_version:
+                self.remember(player_filter, players)
+            callback(players)
+
+        self.controller.search(player_filter, done)
+
+    def cancel(self):
+        self.controller.cancel_search()
@@ -0,0 +1,37 @@
+from collections import namedtuple
+
+# removed - id исчезнувших строк, inserted - (позиция, игрок) новых строк,
+# updated - игроки с тем же id, но изменёнными полями, order - id в новом порядке
+PageDiff = namedtuple("PageDiff", "removed inserted updated order")
+
+PLAYER_FIELDS = (
+    "full_name",
+    "birth_date",
+    "football_team",
+    "home_city",
+    "team_type",
+    "position",
+)
+
+
+def player_content(player) -> tuple:
+    return tuple(getattr(player, field) for field in PLAYER_FIELDS)
+
+
+def diff_pages(old_players, new_players) -> PageDiff:
+    """Разница между двумя страницами игроков по Player.id"""
+    old_by_id = {player.id: player for player in old_players}
+    new_ids = {player.id for player in new_players}
+
+    removed = [player.id for player in old_players if player.id not in new_ids]
+    inserted = []
+    updated = []
+    for index, player in enumerate(new_players):
+        old = old_by_id.get(player.id)
+        if old is None:
+            inserted.append((index, player))
+        elif player_content(old) != player_content(player):
+            updated.append(player)
+
+    order = [player.id for player in new_players]
+    return PageDiff(removed, inserted, updated, order)
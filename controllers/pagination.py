@@ -0,0 +1,62 @@
+from collections import OrderedDict
+from models.crud import Crud
+
+
+class KeysetPaginator:
+    """Постраничная навигация по курсору (sort_key, id) с кэшем посещённых страниц"""
+
+    MAX_CACHED_PAGES = 50
+
+    def __init__(self, criteria: dict = None, sort_key: str = "id"):
+        self.criteria = criteria
+        self.sort_key = sort_key
+        self.records_per_page = 10
+        self.total_records = 0
+        self._pages = OrderedDict()
+        # Номер страницы -> (курсор первой строки, курсор последней строки)
+        self._cursors = {}
+
+    def reset(self, total_records: int, records_per_page: int):
+        self.total_records = total_records
+        self.records_per_page = records_per_page
+        self._pages.clear()
+        self._cursors.clear()
+
+    def total_pages(self) -> int:
+        return max(
+            1,
+            (self.total_records + self.records_per_page - 1) // self.records_per_page,
+        )
+
+    def fetch(self, page: int):
+        if page in self._pages:
+            self._pages.move_to_end(page)
+            return self._pages[page]
+
+        players = self._load(page)
+        self._pages[page] = players
+        if len(self._pages) > self.MAX_CACHED_PAGES:
+            self._pages.popitem(last=False)
+        if players:
+            self._cursors[page] = (
+                Crud.cursor_of(players[0], self.sort_key),
+                Crud.cursor_of(players[-1], self.sort_key),
+            )
+        return players
+
+    def _load(self, page: int):
+        limit = self.records_per_page
+        seek_args = {"criteria": self.criteria, "sort_key": self.sort_key}
+
+        if page == 1:
+            return Crud.seek_page(limit, **seek_args)
+        if page - 1 in self._cursors:
+            return Crud.seek_page(limit, after=self._cursors[page - 1][1], **seek_args)
+        if page + 1 in self._cursors:
+            return Crud.seek_page(limit, before=self._cursors[page + 1][0], **seek_args)
+        if page == self.total_pages():
+            last_page_size = self.total_records - (page - 1) * limit
+            return Crud.seek_page(last_page_size, from_end=True, **seek_args)
+
+        # Произвольный переход без известного соседнего курсора
+        return Crud.get_page((page - 1) * limit, limit, **seek_args)
@@ -1,21 +1,43 @@
+from controllers.controller import PageData
+from controllers.pagination import KeysetPaginator
+from models.crud import Crud
+
+
 class SearchResultsController:
-    def __init__(self, search_results):
-        self.search_results = search_results  # Теперь список Player
+    def __init__(self, criteria, controller):
+        self.criteria = criteria  # Критерии поиска, страницы читаются из Crud
+        # Главный контроллер: его data_version растёт при каждой записи
+        self.controller = controller
+        self.worker = controller.worker
         self.current_page = 1
         self.records_per_page = 10
         self.view = None
+        self.total_records = 0
+        self.paginator = KeysetPaginator(criteria)
+        # Версия данных, для которой посчитаны найденные и заполнен paginator
+        self.counted_version = None
 
     def calculate_total_pages(self):
         return max(
-            1,
-            (len(self.search_results) + self.records_per_page - 1)
-            // self.records_per_page,
+            1, (self.total_records + self.records_per_page - 1) // self.records_per_page
         )
 
-    def get_current_page_data(self):
-        start_idx = (self.current_page - 1) * self.records_per_page
-        end_idx = min(start_idx + self.records_per_page, len(self.search_results))
-        return self.search_results[start_idx:end_idx]
+    def read_page(self, page: int, records_per_page: int, data_version: int):
+        """Выполняется в фоновом потоке.
+
+        После записи или сжатия файла (id в XML сдвигаются) курсоры
+        и страницы paginator устарели, поэтому он сбрасывается.
+        """
+        if self.counted_version != data_version:
+            self.paginator.reset(Crud.count(self.criteria), records_per_page)
+            self.counted_version = data_version
+        elif records_per_page != self.paginator.records_per_page:
+            self.paginator.reset(self.paginator.total_records, records_per_page)
+        total_pages = self.paginator.total_pages()
+        page = min(page, total_pages)
+        return PageData(
+            page, total_pages, self.paginator.total_records, self.paginator.fetch(page)
+        )
 
     def change_page(self, page):
         if 1 <= page <= self.calculate_total_pages():
@@ -51,10 +73,23 @@ class SearchResultsController:
 
     def update_view(self):
         if self.view:
-            page_data = self.get_current_page_data()
-            self.view.update_table(
-                players=page_data,
-                current_page=self.current_page,
-                total_pages=self.calculate_total_pages(),
-                total_records=len(self.search_results),
+            # Ключ - сам контроллер: окна результатов не вытесняют друг друга
+            self.worker.submit(
+                self,
+                self.read_page,
+                self.current_page,
+                self.records_per_page,
+                self.controller.data_version,
+                callback=self.show_page,
+                errback=lambda error: self.view.open_error_window(str(error)),
             )
+
+    def show_page(self, data: PageData):
+        self.current_page = data.page
+        self.total_records = data.total_records
+        self.view.update_table(
+            players=data.players,
+            current_page=data.page,
+            total_pages=data.total_pages,
+            total_records=data.total_records,
+        )
@@ -0,0 +1,131 @@
+import queue
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class BackgroundWorker:
+    """Выполняет вызовы Crud вне потока Tk и возвращает результаты через root.after.
+
+    Задачи с одинаковым ключом вытесняют друг друга: ещё не начатая предыдущая
+    задача отменяется, а результат уже выполняющейся отбрасывается. Задачи без
+    ключа (записи, смена источника) не отменяются никогда.
+    """
+
+    POLL_INTERVAL_MS = 30
+
+    def __init__(self, root, on_busy=None):
+        self.root = root
+        self.on_busy = on_busy
+        # Crud и XMLAdapter хранят общее состояние (кэши, курсоры страниц),
+        # поэтому задачи выполняются по одной и в порядке отправки
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="crud")
+        self.done = queue.Queue()
+        # Ключ -> последняя отправленная задача
+        self.latest = {}
+        self.pending = 0
+        self.polling = False
+        self.busy = False
+
+    def submit(self, key, func, *args, callback=None, errback=None, **kwargs):
+        previous = self.latest.get(key) if key is not None else None
+        if previous is not None:
+            previous.cancel()
+
+        future = self.executor.submit(func, *args, **kwargs)
+        if key is not None:
+            self.latest[key] = future
+        future.add_done_callback(lambda f: self.done.put((key, f, callback, errback)))
+
+        self.pending += 1
+        self.set_busy(True)
+        if not self.polling:
+            self.polling = True
+            self.root.after(self.POLL_INTERVAL_MS, self.poll)
+        return future
+
+    def cancel(self, key):
+        """Отменяет задачу с ключом; если она уже выполняется, результат отбрасывается"""
+        future = self.latest.pop(key, None)
+        if future is not None:
+            future.cancel()
+
+    def poll(self):
+        """Разбирает завершённые задачи в потоке Tk"""
+        try:
+            while True:
+                try:
+                    item = self.done.get_nowait()
+                except queue.Empty:
+                    break
+                self.pending -= 1
+                self.deliver(*item)
+        finally:
+            if self.pending:
+                self.root.after(self.POLL_INTERVAL_MS, self.poll)
+            else:
+                self.polling = False
+                self.set_busy(False)
+
+    def schedule(self, delay_ms: int, func):
+        """Вызов func в потоке Tk через delay_ms; возвращает метку для unschedule"""
+        return self.root.after(delay_ms, func)
+
+    def unschedule(self, handle):
+        self.root.after_cancel(handle)
+
+    def set_busy(self, busy: bool):
+        if busy != self.busy:
+            self.busy = busy
+            if self.on_busy:
+                self.on_busy(busy)
+
+    def deliver(self, key, future, callback, errback):
+        if key is not None:
+            if self.latest.get(key) is not future:
+                return
+            del self.latest[key]
+        if future.cancelled():
+            return
+
+        error = future.exception()
+        if error is None:
+            if callback:
+                callback(future.result())
+        elif errback:
+            errback(error)
+        else:
+            self.root.report_callback_exception(type(error), error, error.__traceback__)
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class ImmediateWorker:
+    """Синхронная замена BackgroundWorker для работы без цикла Tk (скрипты, отладка)"""
+
+    def submit(self, key, func, *args, callback=None, errback=None, **kwargs):
+        future = Future()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as error:
+            future.set_exception(error)
+            if errback is None:
+                raise
+            errback(error)
+        else:
+            future.set_result(result)
+            if callback:
+                callback(result)
+        return future
+
+    def cancel(self, key):
+        pass
+
+    def schedule(self, delay_ms: int, func):
+        # Без цикла событий отложенные вызовы не выполняются
+        return None
+
+    def unschedule(self, handle):
+        pass
+
+    def close(self):
+        pass
@@ -0,0 +1,304 @@
+import json
+import os
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+from models.database import Player
+from models.query import PlayerQuery, seek_positions
+from models.rows import PlayerRow, NO_CODE, TEAM_TYPE_CODES, POSITION_CODES
+from models.fileio import atomic_write, file_mode
+from models.bin_store import (
+    BinStore,
+    DELETED,
+    DICTIONARY_COLUMNS,
+    ENUM_COLUMNS,
+    EPOCH,
+    HEADER,
+    NO_VALUE,
+    RECORD,
+    dictionary_path,
+    drop_store,
+    empty_dictionaries,
+    encode_header,
+    heap_path,
+    open_store,
+    read_header,
+    record_count,
+)
+
+# Пределы полей записи: смещение в куче, длина ФИО и код словаря
+MAX_HEAP_SIZE = 0xFFFFFFFF
+MAX_NAME_LENGTH = 0xFFFF
+
+
+class BinAdapter:
+    """Двоичный колоночный файл игроков с тем же интерфейсом, что у XMLAdapter.
+
+    Новые записи дописываются в конец файла, мягкое удаление выставляет флаг
+    прямо в записи, compact() переписывает файл без помеченных. Как и в XML,
+    id игрока - номер записи в файле.
+    """
+
+    def __init__(self, file_name: str = "models/players.bin"):
+        self.bin_file = Path(file_name)
+
+    @property
+    def path(self) -> Path:
+        return self.bin_file
+
+    def set_file(self, file_path: str):
+        self.bin_file = Path(file_path)
+        self._ensure_file_exists()
+
+    def _ensure_file_exists(self):
+        if not self.bin_file.exists():
+            self._write_generation(
+                0, empty_dictionaries(), b"", np.zeros(0, dtype=RECORD)
+            )
+
+    def _write_generation(
+        self, generation: int, dictionaries: Dict, heap: bytes, records: np.ndarray
+    ):
+        """Пишет кучу, словари и записи поколения generation.
+
+        Замена файла записей - точка фиксации: до неё файл ссылается
+        на предыдущее поколение, которое остаётся целым.
+        """
+        # Файлы нового поколения получают права файла записей
+        mode = file_mode(self.bin_file)
+        atomic_write(heap_path(self.bin_file, generation), heap, mode)
+        self._write_dictionaries(generation, dictionaries, mode)
+        atomic_write(self.bin_file, encode_header(generation) + records.tobytes(), mode)
+
+    def _write_dictionaries(self, generation: int, dictionaries: Dict, mode=None):
+        data = json.dumps(dictionaries, ensure_ascii=False).encode("utf-8")
+        atomic_write(dictionary_path(self.bin_file, generation), data, mode)
+
+    def _read_dictionaries(self, generation: int) -> Dict:
+        with open(dictionary_path(self.bin_file, generation), encoding="utf-8") as file:
+            return json.load(file)
+
+    def _store(self) -> BinStore:
+        self._ensure_file_exists()
+        return open_store(self.bin_file)
+
+    # Запись
+
+    def add_data(self, player: Player) -> None:
+        self.add_many([player])
+
+    def add_many(self, players: Iterable[Player], chunk_size: int = 5000) -> int:
+        """Дописывает игроков порциями: сначала ФИО в кучу и новые значения
+        в словари, затем записи. Оборванная запись оставляет в куче и словарях
+        неиспользуемый хвост, а неполная последняя запись отрезается перед
+        следующей дозаписью.
+        """
+        self._ensure_file_exists()
+        generation = read_header(self.bin_file)
+        dictionaries = self._read_dictionaries(generation)
+        codes = {
+            column: {value: code for code, value in enumerate(dictionaries[column])}
+            for column in DICTIONARY_COLUMNS
+        }
+        added = 0
+        players = iter(players)
+        try:
+            with open(heap_path(self.bin_file, generation), "ab") as heap, open(
+                self.bin_file, "r+b"
+            ) as records:
+                heap_size = heap.seek(0, os.SEEK_END)
+                # Новые записи должны начинаться на границе записи
+                size = records.seek(0, os.SEEK_END)
+                end = HEADER.itemsize + record_count(size) * RECORD.itemsize
+                if end != size:
+                    records.truncate(end)
+                    records.seek(end)
+                while chunk := list(islice(players, chunk_size)):
+                    known = {column: len(codes[column]) for column in codes}
+                    data, names = self._encode(chunk, dictionaries, codes, heap_size)
+                    heap.write(names)
+                    heap.flush()
+                    os.fsync(heap.fileno())
+                    heap_size += len(names)
+                    if any(len(codes[column]) != known[column] for column in codes):
+                        self._write_dictionaries(generation, dictionaries)
+                    records.write(data.tobytes())
+                    records.flush()
+                    os.fsync(records.fileno())
+                    added += len(chunk)
+        finally:
+            drop_store(self.bin_file)
+        return added
+
+    @staticmethod
+    def _encode(players: List, dictionaries: Dict, codes: Dict, heap_offset: int):
+        """Записи порции и байты их ФИО; новые значения добавляются в словари"""
+        names = [player.full_name.encode("utf-8") for player in players]
+        lengths = [len(name) for name in names]
+        if max(lengths) > MAX_NAME_LENGTH:
+            raise ValueError("Слишком длинное ФИО для двоичного файла")
+        offsets = np.cumsum([0] + lengths, dtype=np.int64)[:-1] + heap_offset
+        if offsets[-1] + lengths[-1] > MAX_HEAP_SIZE:
+            raise ValueError("Куча строк двоичного файла переполнена")
+
+        records = np.zeros(len(players), dtype=RECORD)
+        records["name_offset"] = offsets
+        records["name_length"] = lengths
+        for column in DICTIONARY_COLUMNS:
+            column_codes = codes[column]
+            values = []
+            for player in players:
+                value = getattr(player, column)
+                if value is None:
+                    values.append(NO_VALUE)
+                    continue
+                code = column_codes.get(value)
+                if code is None:
+                    code = column_codes[value] = len(column_codes)
+                    if code >= NO_VALUE:
+                        raise ValueError(f"Слишком много различных значений {column}")
+                    dictionaries[column].append(value)
+                values.append(code)
+            records[column] = values
+        records["birth_date"] = [(player.birth_date - EPOCH).days for player in players]
+        records["team_type"] = [
+            TEAM_TYPE_CODES.get(player.team_type, NO_CODE) for player in players
+        ]
+        records["position"] = [
+            POSITION_CODES.get(player.position, NO_CODE) for player in players
+        ]
+        return records, b"".join(names)
+
+    # Чтение
+
+    def get_data(self) -> List[PlayerRow]:
+        store = self._store()
+        return [store.player(row) for row in store.matching_rows()]
+
+    def count(self, player_query: PlayerQuery = None) -> int:
+        store = self._store()
+        if player_query:
+            return len(store.matching_rows(player_query))
+        return store.live_count()
+
+    def get_page(
+        self, offset: int, limit: int, player_query: PlayerQuery = None
+    ) -> List[PlayerRow]:
+        store = self._store()
+        rows = store.matching_rows(player_query)[offset : offset + limit]
+        return [store.player(row) for row in rows]
+
+    def seek_page(
+        self,
+        limit: int,
+        after_id: Optional[int] = None,
+        before_id: Optional[int] = None,
+        from_end: bool = False,
+        player_query: PlayerQuery = None,
+    ) -> List[PlayerRow]:
+        store = self._store()
+        rows = seek_positions(
+            store.matching_rows(player_query), limit, after_id, before_id, from_end
+        )
+        return [store.player(row) for row in rows]
+
+    def signature(self) -> tuple:
+        """mtime и размер файла записей: он меняется при любой записи"""
+        self._ensure_file_exists()
+        return BinStore.stat_signature(self.bin_file)
+
+    def get_by_ids(self, ids: List[int]) -> List[PlayerRow]:
+        store = self._store()
+        return [
+            store.player(row_id - 1)
+            for row_id in ids
+            if 0 < row_id <= len(store) and row_id - 1 not in store.deleted
+        ]
+
+    def group_counts(self, columns: Iterable[str]) -> Dict[str, Dict]:
+        return self._store().group_counts(columns)
+
+    def search(self, player_query: PlayerQuery = None) -> List[PlayerRow]:
+        store = self._store()
+        players = [store.player(row) for row in store.matching_rows(player_query)]
+        return player_query.arrange(players) if player_query is not None else players
+
+    # Удаление
+
+    def tombstones(self) -> set:
+        return {row + 1 for row in self._store().deleted}
+
+    def mark_deleted(self, player_query: PlayerQuery) -> int:
+        """Мягкое удаление: флаг выставляется в записях на месте, O(найденных)"""
+        store = self._store()
+        if player_query.limit is not None or player_query.offset:
+            # Ограничения зависят от порядка, поэтому строки находятся поиском
+            rows = [player.id - 1 for player in self.search(player_query)]
+        else:
+            rows = store.matching_rows(player_query)
+        if not rows:
+            return 0
+
+        records = np.memmap(
+            self.bin_file,
+            dtype=RECORD,
+            mode="r+",
+            offset=HEADER.itemsize,
+            shape=(len(store),),
+        )
+        records["flags"][rows] |= DELETED
+        records.flush()
+        del records
+
+        store.deleted.update(rows)
+        store.remember_signature()
+        return len(rows)
+
+    def delete(self, player_query: PlayerQuery) -> int:
+        """Физическое удаление; заодно очищаются помеченные удалёнными записи"""
+        deleted = self.mark_deleted(player_query)
+        if deleted:
+            self.compact()
+        return deleted
+
+    def compact(self) -> int:
+        """Переписывает файл без помеченных записей новым поколением кучи
+        и словарей; неиспользуемые значения словарей выбрасываются, номера
+        записей сдвигаются.
+        """
+        store = self._store()
+        if not store.deleted:
+            return 0
+        purged = len(store.deleted)
+        live = store.live_mask()
+        records = np.array(store.records[live])
+        records["flags"] = 0
+
+        offsets = records["name_offset"].tolist()
+        lengths = records["name_length"].tolist()
+        heap = b"".join(
+            store.heap[start : start + length]
+            for start, length in zip(offsets, lengths)
+        )
+        records["name_offset"] = np.cumsum([0] + lengths, dtype=np.int64)[:-1]
+
+        dictionaries = empty_dictionaries()
+        for column in DICTIONARY_COLUMNS:
+            values = store.dictionaries[column]
+            codes = records[column]
+            present = codes != NO_VALUE
+            used, inverse = np.unique(codes[present], return_inverse=True)
+            codes[present] = inverse
+            dictionaries[column] = [values[code] for code in used.tolist()]
+        # Перечисления переводятся в текущий порядок членов
+        for column in ENUM_COLUMNS:
+            records[column] = store.enum_codes[column][live]
+
+        old_generation = store.generation
+        drop_store(self.bin_file)
+        store.close()
+        self._write_generation(old_generation + 1, dictionaries, heap, records)
+        heap_path(self.bin_file, old_generation).unlink(missing_ok=True)
+        dictionary_path(self.bin_file, old_generation).unlink(missing_ok=True)
+        return purged
@@ -0,0 +1,301 @@
+import json
+import mmap
+import os
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+from models.rows import (
+    NO_CODE,
+    PlayerRow,
+    TEAM_TYPES,
+    POSITIONS,
+    TEAM_TYPE_BY_NAME,
+    POSITION_BY_NAME,
+)
+
+# Файл записей: заголовок, затем записи фиксированной длины подряд
+MAGIC = b"FPLBIN01"
+HEADER = np.dtype([("magic", "S8"), ("heap_generation", "<u4"), ("reserved", "<u4")])
+RECORD = np.dtype(
+    [
+        ("name_offset", "<u4"),  # начало ФИО в куче строк
+        ("name_length", "<u2"),  # длина ФИО в байтах UTF-8
+        ("football_team", "<u2"),  # код в словаре команд
+        ("home_city", "<u2"),  # код в словаре городов
+        ("birth_date", "<i4"),  # дни от 1970-01-01
+        ("team_type", "i1"),  # номер члена TeamType, -1 - пусто
+        ("position", "i1"),  # номер члена PlayerPosition, -1 - пусто
+        ("flags", "u1"),
+    ]
+)
+# Код пустой команды или города
+NO_VALUE = 0xFFFF
+# Флаг записи, помеченной удалённой
+DELETED = 1
+EPOCH = date(1970, 1, 1)
+# Колонки со словарями строк и перечисления с хранимыми именами членов
+DICTIONARY_COLUMNS = ("football_team", "home_city")
+ENUM_COLUMNS = {"team_type": TEAM_TYPES, "position": POSITIONS}
+ENUM_CODES_BY_NAME = {"team_type": TEAM_TYPE_BY_NAME, "position": POSITION_BY_NAME}
+
+
+def heap_path(path: Path, generation: int) -> Path:
+    """Куча строк; поколение меняется при сжатии, файл записей ссылается на своё"""
+    return path.with_name(f"{path.name}.heap{generation}")
+
+
+def dictionary_path(path: Path, generation: int) -> Path:
+    """Словари команд, городов и имён членов перечислений того же поколения"""
+    return path.with_name(f"{path.name}.dict{generation}.json")
+
+
+def empty_dictionaries() -> Dict[str, list]:
+    dictionaries = {column: [] for column in DICTIONARY_COLUMNS}
+    for column, members in ENUM_COLUMNS.items():
+        dictionaries[column] = [member.name for member in members]
+    return dictionaries
+
+
+def encode_header(heap_generation: int) -> bytes:
+    header = np.zeros(1, dtype=HEADER)
+    header["magic"] = MAGIC
+    header["heap_generation"] = heap_generation
+    return header.tobytes()
+
+
+def record_count(size: int) -> int:
+    """Число целых записей в файле записей размера size"""
+    return max(0, size - HEADER.itemsize) // RECORD.itemsize
+
+
+def read_header(path: Path) -> int:
+    """Номер поколения кучи и словарей из заголовка файла записей"""
+    header = np.fromfile(path, dtype=HEADER, count=1)
+    if len(header) != 1 or header["magic"][0] != MAGIC:
+        raise ValueError(f"Не двоичный файл игроков: {path}")
+    return int(header["heap_generation"][0])
+
+
+class BinStore:
+    """Открытый двоичный файл игроков: колонки NumPy поверх mmap.
+
+    Записи фиксированной длины хранят коды команд и городов из словарей,
+    номера перечислений, дату днями и ссылку на ФИО в куче строк. Строки
+    адресуются позицией (id = позиция + 1). Для поиска BinStore даёт те же
+    lookup, index_rows и full_name_cf, что и XMLCache.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.signature = self.stat_signature(path)
+        self.generation = read_header(path)
+
+        # Неполная последняя запись (оборванная дозапись) не отображается
+        count = record_count(os.path.getsize(path))
+        if count:
+            self.records = np.memmap(
+                path, dtype=RECORD, mode="r", offset=HEADER.itemsize, shape=(count,)
+            )
+        else:
+            self.records = np.zeros(0, dtype=RECORD)
+
+        with open(dictionary_path(path, self.generation), encoding="utf-8") as file:
+            self.dictionaries = json.load(file)
+        self.enum_codes = {column: self._enum_codes(column) for column in ENUM_COLUMNS}
+        self.deleted = set(np.flatnonzero(self.records["flags"] & DELETED).tolist())
+        self.heap = self._map_heap()
+        self._names = None
+        self._full_name_cf = None
+
+    def __len__(self):
+        return len(self.records)
+
+    @staticmethod
+    def stat_signature(path: Path) -> tuple:
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def remember_signature(self):
+        self.signature = self.stat_signature(self.path)
+
+    def is_fresh(self) -> bool:
+        try:
+            return self.signature == self.stat_signature(self.path)
+        except FileNotFoundError:
+            return False
+
+    def close(self):
+        """Закрывает отображения файлов: в Windows отображённый файл нельзя
+        заменить. Колонки, переживающие close(), хранятся копиями.
+        """
+        if isinstance(self.heap, mmap.mmap):
+            self.heap.close()
+        if isinstance(self.records, np.memmap):
+            self.records._mmap.close()
+        self.heap = b""
+        self.records = np.zeros(0, dtype=RECORD)
+
+    def _map_heap(self):
+        with open(heap_path(self.path, self.generation), "rb") as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return b""
+            return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _enum_codes(self, column: str) -> np.ndarray:
+        # Номера членов в файле переводятся в текущие, если порядок в коде изменился
+        # Копия, а не вид: колонка не должна удерживать отображение файла
+        codes = np.array(self.records[column], dtype=np.int8)
+        stored = self.dictionaries[column]
+        current = [member.name for member in ENUM_COLUMNS[column]]
+        if stored == current:
+            return codes
+        by_name = ENUM_CODES_BY_NAME[column]
+        mapping = np.asarray([by_name[name] for name in stored], dtype=np.int8)
+        return np.where(codes == NO_CODE, NO_CODE, mapping[codes])
+
+    # Значения строк
+
+    def name(self, position: int) -> str:
+        record = self.records[position]
+        start = int(record["name_offset"])
+        return self.heap[start : start + int(record["name_length"])].decode("utf-8")
+
+    @property
+    def names(self) -> List[str]:
+        """ФИО всех записей; куча читается целиком один раз при первом обращении"""
+        if self._names is None:
+            heap = bytes(self.heap)
+            offsets = self.records["name_offset"].tolist()
+            lengths = self.records["name_length"].tolist()
+            self._names = [
+                heap[start : start + length].decode("utf-8")
+                for start, length in zip(offsets, lengths)
+            ]
+        return self._names
+
+    @property
+    def full_name_cf(self) -> List[str]:
+        if self._full_name_cf is None:
+            self._full_name_cf = [name.casefold() for name in self.names]
+        return self._full_name_cf
+
+    def _dictionary_value(self, column: str, code: int) -> Optional[str]:
+        return None if code == NO_VALUE else self.dictionaries[column][code]
+
+    def player(self, position: int) -> PlayerRow:
+        record = self.records[position]
+        team_type = int(self.enum_codes["team_type"][position])
+        player_position = int(self.enum_codes["position"][position])
+        return PlayerRow(
+            position + 1,
+            self._names[position] if self._names is not None else self.name(position),
+            EPOCH + timedelta(days=int(record["birth_date"])),
+            self._dictionary_value("football_team", int(record["football_team"])),
+            self._dictionary_value("home_city", int(record["home_city"])),
+            None if team_type == NO_CODE else team_type,
+            None if player_position == NO_CODE else player_position,
+            self._full_name_cf[position] if self._full_name_cf is not None else None,
+        )
+
+    # Поиск: тот же интерфейс, что у XMLCache
+
+    def _codes(self, column: str) -> np.ndarray:
+        if column in ENUM_COLUMNS:
+            return self.enum_codes[column]
+        return self.records[column]
+
+    def _code_of(self, column: str, value) -> Optional[int]:
+        if column == "birth_date":
+            return (value - EPOCH).days
+        if column in ENUM_COLUMNS:
+            return ENUM_COLUMNS[column].index(value)
+        try:
+            return self.dictionaries[column].index(value)
+        except ValueError:
+            return None
+
+    def lookup(self, column: str, value) -> List[int]:
+        code = self._code_of(column, value)
+        if code is None:
+            return []
+        return np.flatnonzero(self._codes(column) == code).tolist()
+
+    def index_rows(self, column: str, test) -> set:
+        """Позиции строк, у которых значение колонки проходит test.
+
+        test проверяет словарь различных значений, строки сравниваются кодами.
+        """
+        if column == "birth_date":
+            days = np.unique(self.records["birth_date"])
+            codes = [day for day in days.tolist() if test(EPOCH + timedelta(days=day))]
+        elif column in ENUM_COLUMNS:
+            codes = [
+                code for code, member in enumerate(ENUM_COLUMNS[column]) if test(member)
+            ]
+        else:
+            codes = [
+                code
+                for code, value in enumerate(self.dictionaries[column])
+                if test(value)
+            ]
+        if not codes:
+            return set()
+        return set(np.flatnonzero(np.isin(self._codes(column), codes)).tolist())
+
+    def live_mask(self) -> np.ndarray:
+        return (self.records["flags"] & DELETED) == 0
+
+    def matching_rows(self, player_query=None) -> List[int]:
+        """Возрастающие позиции живых строк, подходящих под PlayerQuery"""
+        if player_query is None or player_query.is_empty():
+            return np.flatnonzero(self.live_mask()).tolist()
+        return sorted(player_query.cache_rows(self) - self.deleted)
+
+    def live_count(self) -> int:
+        return len(self) - len(self.deleted)
+
+    # Агрегаты
+
+    def group_counts(self, columns: Iterable[str]) -> Dict[str, Dict]:
+        """Количество живых строк по значениям колонок, подсчёт по кодам"""
+        live = self.live_mask()
+        result = {}
+        for column in columns:
+            codes = self._codes(column)[live]
+            values, counts = np.unique(codes, return_counts=True)
+            result[column] = {
+                self._decode(column, int(code)): int(count)
+                for code, count in zip(values, counts)
+            }
+        return result
+
+    def _decode(self, column: str, code: int):
+        if column == "birth_date":
+            return EPOCH + timedelta(days=code)
+        if column in ENUM_COLUMNS:
+            return None if code == NO_CODE else ENUM_COLUMNS[column][code]
+        return self._dictionary_value(column, code)
+
+
+# Открытые файлы разделяются между экземплярами BinAdapter
+_stores: Dict[Path, BinStore] = {}
+
+
+def get_store(path: Path) -> Optional[BinStore]:
+    store = _stores.get(path.resolve())
+    if store is not None and store.is_fresh():
+        return store
+    return None
+
+
+def open_store(path: Path) -> BinStore:
+    store = get_store(path)
+    if store is None:
+        store = BinStore(path)
+        _stores[path.resolve()] = store
+    return store
+
+
+def drop_store(path: Path):
+    _stores.pop(path.resolve(), None)
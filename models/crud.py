@@ -1,20 +1,182 @@
-from models.database import Session, Player, TeamType, PlayerPosition
+import json
+import os
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+from models.database import engine, Player, TeamType, PlayerPosition
+from models.filters import PlayerFilter
+from models.query import Condition, PlayerQuery, LIVE, ROW_COLUMNS
+from models.query_cache import QueryCache
+from models.rows import PlayerRow, TEAM_TYPE_BY_NAME, POSITION_BY_NAME
+from models.stats import STATS_SECTIONS, bucket_ages
 from models.xml_adapter import XMLAdapter
-from sqlalchemy import and_, or_
+from models.bin_adapter import BinAdapter
+from sqlalchemy import (
+    delete,
+    func,
+    insert,
+    select,
+    text,
+    update,
+)
 from datetime import date
+from itertools import islice
+from typing import Iterable, Iterator, List, Union
+
+# Мягкое удаление по умолчанию: FOOTBALL_SOFT_DELETE=0 удаляет строки сразу
+SOFT_DELETE = os.environ.get("FOOTBALL_SOFT_DELETE", "1") != "0"
+
+# Поля игрока, переносимые export_to
+PLAYER_COLUMNS = (
+    "full_name",
+    "birth_date",
+    "football_team",
+    "home_city",
+    "team_type",
+    "position",
+)
+
+# Подтверждение удаления: сколько игроков подходит и несколько примеров
+DeletePreview = namedtuple("DeletePreview", "total sample")
+# Ход удаления порциями: удалено всего и пройденная доля диапазона id
+DeleteProgress = namedtuple("DeleteProgress", "deleted fraction")
 
 
 class Crud:
     data_source = "db"
     xml_adapter = XMLAdapter()
+    bin_adapter = BinAdapter()
+    # Кэш COUNT(*) для текущего источника: записи сдвигают его, а не сбрасывают
+    _count_cache = None
+    # (ключ кэша, статистика): ключ меняется при записи и смене источника
+    _stats_cache = None
+    # Результаты поиска (списки id), сбрасываются при любой записи
+    query_cache = QueryCache()
+    # Состояние потока: глубина вложенных вызовов и открытая общая транзакция
+    _local = threading.local()
+    # Размер порции для executemany при массовой вставке
+    BULK_CHUNK_SIZE = 5000
+    # Сколько игроков удаляется одной порцией
+    DELETE_CHUNK_SIZE = 5000
+    # Удаление только помечает строки, физически их убирает compact()
+    soft_delete = SOFT_DELETE
+    # Очистка нужна сразу, если помеченных не меньше стольких строк
+    # или не меньше такой доли живых
+    COMPACT_MIN_TOMBSTONES = 10000
+    COMPACT_TOMBSTONE_RATIO = 0.25
+    # VACUUM после очистки, если свободно не меньше такой доли страниц файла
+    VACUUM_FREE_RATIO = 0.25
+    # Допустимые ключи сортировки для постраничной навигации по курсору
+    SORT_KEYS = ("id", "full_name", "birth_date")
+    ROW_COLUMNS = ROW_COLUMNS
+
+    @staticmethod
+    @contextmanager
+    def _connection():
+        """Соединение текущего потока, взятое из пула один раз и переиспользуемое.
+
+        Вложенные вызовы Crud и вызовы внутри transaction() работают в одном
+        соединении; внешний вызов вне transaction() завершается commit.
+        """
+        local = Crud._local
+        connection = getattr(local, "connection", None)
+        # engine.dispose() заменяет пул, соединение старого пула не берётся
+        if connection is None or local.pool is not engine.pool:
+            if connection is not None:
+                connection.close()
+            connection = local.connection = engine.connect()
+            local.pool = engine.pool
+
+        depth = getattr(local, "depth", 0)
+        local.depth = depth + 1
+        try:
+            yield connection
+        except BaseException:
+            if depth == 0 and not getattr(local, "in_transaction", False):
+                connection.rollback()
+            raise
+        else:
+            if depth == 0 and not getattr(local, "in_transaction", False):
+                connection.commit()
+        finally:
+            local.depth = depth
+
+    @staticmethod
+    @contextmanager
+    def transaction():
+        """Одна транзакция SQLite на несколько вызовов Crud, например поиск и удаление.
+
+        При исключении всё откатывается. Для файловых источников вызовы
+        выполняются сразу: откатить запись в файл нельзя.
+        """
+        if Crud.data_source != "db" or getattr(Crud._local, "in_transaction", False):
+            yield
+            return
+
+        with Crud._connection() as connection:
+            Crud._local.in_transaction = True
+            try:
+                yield
+                connection.commit()
+            except BaseException:
+                connection.rollback()
+                # Счётчики уже сдвинуты откатанными записями
+                Crud._invalidate_count()
+                Crud.query_cache.invalidate()
+                raise
+            finally:
+                Crud._local.in_transaction = False
 
     @staticmethod
     def set_data_source(source: str):
         Crud.data_source = source
+        Crud._invalidate_count()
 
     @staticmethod
     def change_xml_file(file_path: str):
         Crud.xml_adapter = XMLAdapter(file_path)
+        Crud._invalidate_count()
+
+    @staticmethod
+    def change_bin_file(file_path: str):
+        Crud.bin_adapter = BinAdapter(file_path)
+        Crud._invalidate_count()
+
+    @staticmethod
+    def _file_adapter():
+        """Адаптер файлового источника: XML или двоичный колоночный файл"""
+        return Crud.bin_adapter if Crud.data_source == "bin" else Crud.xml_adapter
+
+    @staticmethod
+    def _invalidate_count():
+        Crud._count_cache = None
+
+    @staticmethod
+    def _adjust_count(delta: int):
+        if Crud._count_cache is not None:
+            Crud._count_cache += delta
+
+    @staticmethod
+    def _data_changed(delta: int):
+        Crud._adjust_count(delta)
+        Crud.query_cache.invalidate()
+
+    @staticmethod
+    def _cache_key(method: str, *args) -> tuple:
+        if Crud.data_source == "db":
+            source = ("db",)
+        else:
+            adapter = Crud._file_adapter()
+            source = (
+                Crud.data_source,
+                str(adapter.path.resolve()),
+                adapter.signature(),
+            )
+        return Crud.query_cache.key(*source, method, *args)
+
+    @staticmethod
+    def query_cache_stats() -> dict:
+        return Crud.query_cache.stats()
 
     @staticmethod
     def add_data(
@@ -25,166 +187,446 @@ class Crud:
         team_type: TeamType,
         position: PlayerPosition,
     ):
-        new_player = Player(
-            full_name=full_name,
-            birth_date=birth_date,
-            football_team=football_team,
-            home_city=home_city,
-            team_type=team_type,
-            position=position,
-        )
+        values = {
+            "full_name": full_name,
+            "birth_date": birth_date,
+            "football_team": football_team,
+            "home_city": home_city,
+            "team_type": team_type,
+            "position": position,
+        }
 
         if Crud.data_source == "db":
-            with Session() as session:
-                session.add(new_player)
-                session.commit()
+            with Crud._connection() as connection:
+                connection.execute(insert(Player).values(**values))
         else:
-            Crud.xml_adapter.add_data(new_player)
+            Crud._file_adapter().add_data(Player(**values))
+        Crud._data_changed(1)
 
     @staticmethod
-    def get_data():
+    def add_many(rows: Iterable[dict], chunk_size: int = None) -> int:
+        """Массовая вставка словарей с полями Player в одной транзакции.
+
+        Строки читаются из итератора порциями по chunk_size, поэтому
+        генератор на миллионы записей не материализуется целиком.
+        """
+        chunk_size = chunk_size or Crud.BULK_CHUNK_SIZE
+        rows = iter(rows)
+        inserted = 0
+
         if Crud.data_source == "db":
-            with Session() as session:
-                return session.query(Player).all()
+            with Crud._connection() as connection:
+                while chunk := list(islice(rows, chunk_size)):
+                    connection.execute(insert(Player), chunk)
+                    inserted += len(chunk)
         else:
-            return Crud.xml_adapter.get_data()
+            inserted = Crud._file_adapter().add_many(
+                (Player(**row) for row in rows), chunk_size
+            )
+        Crud._data_changed(inserted)
+        return inserted
+
+    @staticmethod
+    def export_to(target: str, file_path: str = None) -> int:
+        """Копирует живых игроков текущего источника в другой: "db", "xml"
+        или "bin". Файл по умолчанию - файл адаптера источника target.
+
+        Игроки дописываются к уже имеющимся, id в приёмнике назначаются заново.
+        Так данные переносятся между SQLite, XML и двоичным файлом.
+        """
+        if target == "db":
+            if Crud.data_source == "db":
+                raise ValueError("Источник и приёмник совпадают")
+            rows = (
+                {column: getattr(player, column) for column in PLAYER_COLUMNS}
+                for player in Crud.get_data()
+            )
+            exported = 0
+            with Crud._connection() as connection:
+                while chunk := list(islice(rows, Crud.BULK_CHUNK_SIZE)):
+                    connection.execute(insert(Player), chunk)
+                    exported += len(chunk)
+            # Ключ кэша базы не зависит от её содержимого, поэтому сброс явный
+            Crud.query_cache.invalidate()
+            return exported
+
+        adapters = {
+            "xml": (XMLAdapter, Crud.xml_adapter),
+            "bin": (BinAdapter, Crud.bin_adapter),
+        }
+        if target not in adapters:
+            raise ValueError(f"Неизвестный источник: {target}")
+        adapter_class, current = adapters[target]
+        adapter = adapter_class(file_path) if file_path else adapter_class(current.path)
+        if Crud.data_source != "db" and (
+            adapter.path.resolve() == Crud._file_adapter().path.resolve()
+        ):
+            raise ValueError("Источник и приёмник совпадают")
+        players = (
+            Player(**{column: getattr(player, column) for column in PLAYER_COLUMNS})
+            for player in Crud.get_data()
+        )
+        return adapter.add_many(players, Crud.BULK_CHUNK_SIZE)
 
     @staticmethod
-    def search_by_name_or_birth(name_part: str = None, birth_date: date = None):
+    def get_data():
         if Crud.data_source == "db":
-            with Session() as session:
-                query = session.query(Player)
-                filters = []
-
-                if name_part:
-                    filters.append(Player.full_name.ilike(f"%{name_part}%"))
-                if birth_date:
-                    filters.append(Player.birth_date == birth_date)
-
-                if filters:
-                    query = query.filter(or_(*filters))
-                return query.all()
+            with Crud._connection() as connection:
+                return Crud._rows(connection, *PlayerQuery().statement())
         else:
-            filters = {}
-            if name_part:
-                filters["full_name_part"] = name_part
-            if birth_date:
-                filters["birth_date"] = birth_date
-            return Crud.xml_adapter.search(**filters)
+            return Crud._file_adapter().get_data()
 
     @staticmethod
-    def search_by_position_or_team_type(
-        position: PlayerPosition = None, team_type: TeamType = None
-    ):
+    def _filter(criteria: Union[dict, PlayerFilter, None]) -> PlayerFilter:
+        """Критерии поиска в виде словаря или готового PlayerFilter"""
+        if isinstance(criteria, PlayerFilter):
+            return criteria
+        return PlayerFilter.from_criteria(criteria)
+
+    @staticmethod
+    def _query(criteria: Union[dict, PlayerFilter, Condition, PlayerQuery, None]):
+        """Любая форма критериев, приведённая к PlayerQuery"""
+        if isinstance(criteria, PlayerQuery):
+            return criteria
+        if isinstance(criteria, Condition):
+            return PlayerQuery(criteria)
+        return PlayerQuery(Crud._filter(criteria).condition())
+
+    @staticmethod
+    def _rows(connection, statement, parameters: dict = None) -> List[PlayerRow]:
+        team_types, positions = TEAM_TYPE_BY_NAME, POSITION_BY_NAME
+        return [
+            PlayerRow(
+                player_id,
+                full_name,
+                birth_date,
+                team,
+                city,
+                team_types.get(team_type),
+                positions.get(position),
+                full_name_cf,
+            )
+            for (
+                player_id,
+                full_name,
+                birth_date,
+                team,
+                city,
+                team_type,
+                position,
+                full_name_cf,
+            ) in connection.execute(statement, parameters or {})
+        ]
+
+    @staticmethod
+    def explain(criteria) -> list:
+        """План выполнения поиска: строки EXPLAIN QUERY PLAN или обход файла"""
+        if Crud.data_source != "db":
+            return [f"SCAN {Crud.data_source} file"]
+        with Crud._connection() as connection:
+            statement, parameters = Crud._query(criteria).statement()
+            compiled = statement.params(parameters).compile(
+                dialect=connection.dialect, compile_kwargs={"literal_binds": True}
+            )
+            rows = connection.execute(text(f"EXPLAIN QUERY PLAN {compiled}"))
+            return [row.detail for row in rows]
+
+    @staticmethod
+    def _id_list(ids: List[int]):
+        """Подзапрос со списком id: весь список уходит одним параметром,
+        SQLite разворачивает его json_each"""
+        return select(func.json_each(json.dumps(ids)).table_valued("value").c.value)
+
+    @staticmethod
+    def get_by_ids(ids: List[int]):
+        """Игроки по списку id в порядке возрастания id"""
+        if Crud.data_source != "db":
+            return Crud._file_adapter().get_by_ids(sorted(ids))
+        statement = (
+            select(*Crud.ROW_COLUMNS)
+            .where(LIVE, Player.id.in_(Crud._id_list(ids)))
+            .order_by(Player.id)
+        )
+        with Crud._connection() as connection:
+            return Crud._rows(connection, statement)
+
+    @staticmethod
+    def stats() -> dict:
+        """Количество игроков по командам, позициям, составам, городам и возрасту.
+
+        В SQLite считается через GROUP BY по индексированным колонкам, в XML -
+        по индексам копии в памяти, в двоичном файле - по кодам колонок.
+        Возраст группируется по различным датам рождения, поэтому список
+        игроков целиком нигде не строится.
+        """
+        today = date.today()
+        key = Crud._cache_key("stats", today)
+        if Crud._stats_cache is not None and Crud._stats_cache[0] == key:
+            return Crud._stats_cache[1]
+
+        columns = [column for column in STATS_SECTIONS if column != "age"]
+        columns.append("birth_date")
         if Crud.data_source == "db":
-            with Session() as session:
-                query = session.query(Player)
-                filters = []
-
-                if position:
-                    filters.append(Player.position == position)
-                if team_type:
-                    filters.append(Player.team_type == team_type)
-
-                if filters:
-                    query = query.filter(or_(*filters))
-                return query.all()
+            with Crud._connection() as connection:
+                counts = {}
+                for column in columns:
+                    attribute = getattr(Player, column)
+                    statement = (
+                        select(attribute, func.count()).where(LIVE).group_by(attribute)
+                    )
+                    counts[column] = dict(connection.execute(statement).all())
         else:
-            return Crud.xml_adapter.search(position_or_team_type=position or team_type)
+            counts = Crud._file_adapter().group_counts(columns)
+
+        counts["age"] = bucket_ages(counts.pop("birth_date").items(), today)
+        Crud._stats_cache = (key, counts)
+        return counts
 
     @staticmethod
-    def search_by_team_or_city(team: str = None, city: str = None):
+    def search(criteria):
+        """Игроки по словарю критериев, PlayerFilter, условию или PlayerQuery"""
+        query = Crud._query(criteria)
+        key = Crud._cache_key("search", query.key())
+        ids = Crud.query_cache.get(key)
+        if ids is not None:
+            players = Crud.get_by_ids(ids)
+            if query.order_by == ("id",):
+                return players
+            # Список id уже в порядке результата, get_by_ids сортирует по id
+            by_id = {player.id: player for player in players}
+            return [by_id[player_id] for player_id in ids]
+
         if Crud.data_source == "db":
-            with Session() as session:
-                query = session.query(Player)
-                filters = []
-
-                if team:
-                    filters.append(Player.football_team.ilike(f"%{team}%"))
-                if city:
-                    filters.append(Player.home_city.ilike(f"%{city}%"))
-
-                if filters:
-                    query = query.filter(or_(*filters))
-                return query.all()
+            with Crud._connection() as connection:
+                players = Crud._rows(connection, *query.statement())
         else:
-            return Crud.xml_adapter.search(team_or_city=team or city)
+            players = Crud._file_adapter().search(query)
+        Crud.query_cache.put(key, [player.id for player in players])
+        return players
 
     @staticmethod
-    def delete_by_name_or_birth(name_part: str = None, birth_date: date = None):
-        if not name_part and not birth_date:
-            return 0
+    def count(criteria=None) -> int:
+        query = Crud._query(criteria)
+        # Кэшируется только общее количество записей без фильтров
+        if query or query.limit is not None or query.offset:
+            # Если этот поиск уже выполнялся, ответ - длина его списка id
+            ids = Crud.query_cache.get(Crud._cache_key("search", query.key()))
+            if ids is not None:
+                return len(ids)
+            if Crud.data_source == "db":
+                with Crud._connection() as connection:
+                    return connection.execute(*query.statement("count")).scalar()
+            if query.limit is not None or query.offset:
+                # Ограничения зависят от порядка строк, их применяет search
+                return len(Crud._file_adapter().search(query))
+            # Адаптер считает без списка игроков, потоковый XML - без памяти
+            return Crud._file_adapter().count(query)
+
+        if Crud._count_cache is None:
+            if Crud.data_source == "db":
+                with Crud._connection() as connection:
+                    statement = select(func.count(Player.id)).where(LIVE)
+                    Crud._count_cache = connection.execute(statement).scalar()
+            else:
+                Crud._count_cache = Crud._file_adapter().count()
+        return Crud._count_cache
 
+    @staticmethod
+    def get_page(offset: int, limit: int, criteria=None, sort_key: str = "id"):
+        query = Crud._query(criteria)
         if Crud.data_source == "db":
-            with Session() as session:
-                query = session.query(Player)
-                filters = []
-
-                if name_part:
-                    filters.append(Player.full_name.ilike(f"%{name_part}%"))
-                if birth_date:
-                    filters.append(Player.birth_date == birth_date)
-
-                if filters:
-                    query = query.filter(or_(*filters))
-                    deleted_count = query.delete(synchronize_session=False)
-                    session.commit()
-                    return deleted_count
-                return 0
+            query = query.replace(order_by=(sort_key,), offset=offset, limit=limit)
+            with Crud._connection() as connection:
+                return Crud._rows(connection, *query.statement())
         else:
-            filters = {}
-            if name_part:
-                filters["full_name_part"] = name_part
-            if birth_date:
-                filters["birth_date"] = birth_date
-            return Crud.xml_adapter.delete(**filters)
+            return Crud._file_adapter().get_page(offset, limit, query)
+
+    @staticmethod
+    def cursor_of(player: PlayerRow, sort_key: str = "id") -> tuple:
+        return getattr(player, sort_key), player.id
 
     @staticmethod
-    def delete_by_position_or_team_type(
-        position: PlayerPosition = None, team_type: TeamType = None
+    def seek_page(
+        limit: int,
+        after: tuple = None,
+        before: tuple = None,
+        from_end: bool = False,
+        criteria: dict = None,
+        sort_key: str = "id",
     ):
-        if not position and not team_type:
-            return 0
+        """Страница по курсору (значение sort_key, id) без OFFSET.
 
-        if Crud.data_source == "db":
-            with Session() as session:
-                query = session.query(Player)
-                filters = []
-
-                if position:
-                    filters.append(Player.position == position)
-                if team_type:
-                    filters.append(Player.team_type == team_type)
-
-                if filters:
-                    query = query.filter(or_(*filters))
-                    deleted_count = query.delete(synchronize_session=False)
-                    session.commit()
-                    return deleted_count
-                return 0
+        after - строки строго после курсора, before - строго перед ним,
+        from_end - последние limit строк. Без курсоров - первая страница.
+        """
+        backward = before is not None or from_end
+
+        if Crud.data_source != "db":
+            if sort_key != "id":
+                raise ValueError("Файловые источники сортируются только по id")
+            return Crud._file_adapter().seek_page(
+                limit,
+                after_id=after[1] if after else None,
+                before_id=before[1] if before else None,
+                from_end=from_end,
+                player_query=Crud._query(criteria),
+            )
+
+        if sort_key not in Crud.SORT_KEYS:
+            raise ValueError(f"Недопустимый ключ сортировки: {sort_key}")
+        if after is not None:
+            seek = ("after", sort_key, after)
+        elif before is not None:
+            seek = ("before", sort_key, before)
         else:
-            return Crud.xml_adapter.delete(position_or_team_type=position or team_type)
+            seek = None
+        order_by = ("-" + sort_key,) if backward else (sort_key,)
+        query = Crud._query(criteria).replace(order_by=order_by, limit=limit, seek=seek)
+        with Crud._connection() as connection:
+            players = Crud._rows(connection, *query.statement())
+
+        if backward:
+            players.reverse()
+        return players
 
     @staticmethod
-    def delete_by_team_or_city(team: str = None, city: str = None):
-        if not team and not city:
+    def delete(criteria) -> int:
+        query = Crud._query(criteria)
+        if not query:
             return 0
 
         if Crud.data_source == "db":
-            with Session() as session:
-                query = session.query(Player)
-                filters = []
-
-                if team:
-                    filters.append(Player.football_team.ilike(f"%{team}%"))
-                if city:
-                    filters.append(Player.home_city.ilike(f"%{city}%"))
-
-                if filters:
-                    query = query.filter(or_(*filters))
-                    deleted_count = query.delete(synchronize_session=False)
-                    session.commit()
-                    return deleted_count
-                return 0
+            kind = "tombstone" if Crud.soft_delete else "delete"
+            with Crud._connection() as connection:
+                deleted_count = connection.execute(*query.statement(kind)).rowcount
+        elif Crud.soft_delete:
+            deleted_count = Crud._file_adapter().mark_deleted(query)
         else:
-            return Crud.xml_adapter.delete(team_or_city=team or city)
+            deleted_count = Crud._file_adapter().delete(query)
+        Crud._data_changed(-deleted_count)
+        return deleted_count
+
+    @staticmethod
+    def tombstone_count() -> int:
+        """Сколько строк помечено удалёнными и ждёт compact()"""
+        if Crud.data_source != "db":
+            return len(Crud._file_adapter().tombstones())
+        statement = select(func.count(Player.id)).where(Player.deleted_at.is_not(None))
+        with Crud._connection() as connection:
+            return connection.execute(statement).scalar()
+
+    @staticmethod
+    def needs_compaction() -> bool:
+        tombstones = Crud.tombstone_count()
+        return tombstones > 0 and (
+            tombstones >= Crud.COMPACT_MIN_TOMBSTONES
+            or tombstones >= Crud.COMPACT_TOMBSTONE_RATIO * Crud.count()
+        )
+
+    @staticmethod
+    def compact() -> int:
+        """Физически удаляет помеченные строки: DELETE порциями или перезапись
+        файла. Возвращает количество очищенных строк.
+        """
+        purged = 0
+        for step in Crud.compact_chunks():
+            purged = step.deleted
+        return purged
+
+    @staticmethod
+    def compact_chunks(chunk_size: int = None) -> Iterator[DeleteProgress]:
+        """Очистка порциями, как delete_chunks: шаг генератора на порцию.
+
+        В базе id помеченных берутся из частичного индекса один раз, а VACUUM
+        выполняется только если свободные страницы составляют заметную долю
+        файла. Живые строки не меняются, но в файлах номера записей сдвигаются,
+        поэтому кэш результатов сбрасывается.
+        """
+        if Crud.data_source != "db":
+            purged = Crud._file_adapter().compact()
+            if purged:
+                Crud._data_changed(0)
+                yield DeleteProgress(purged, 1.0)
+            return
+
+        statement = select(Player.id).where(Player.deleted_at.is_not(None))
+        with Crud._connection() as connection:
+            ids = connection.execute(statement).scalars().all()
+        yield from Crud._delete_ids_in_chunks(ids, "purge", chunk_size)
+        if ids and Crud._needs_vacuum():
+            # VACUUM не выполняется внутри транзакции
+            with engine.connect().execution_options(
+                isolation_level="AUTOCOMMIT"
+            ) as connection:
+                connection.exec_driver_sql("VACUUM")
+
+    @staticmethod
+    def _needs_vacuum() -> bool:
+        if getattr(Crud._local, "in_transaction", False):
+            return False
+        with Crud._connection() as connection:
+            free = connection.exec_driver_sql("PRAGMA freelist_count").scalar()
+            pages = connection.exec_driver_sql("PRAGMA page_count").scalar()
+        return free > 0 and free >= Crud.VACUUM_FREE_RATIO * pages
+
+    @staticmethod
+    def preview_delete(criteria, sample_size: int = 10) -> DeletePreview:
+        """Количество и первые игроки, которых удалит delete(criteria)"""
+        query = Crud._query(criteria)
+        if not query:
+            return DeletePreview(0, [])
+        sample = Crud.search(query.replace(limit=sample_size))
+        return DeletePreview(Crud.count(query), sample)
+
+    @staticmethod
+    def delete_chunks(criteria, chunk_size: int = None) -> Iterator[DeleteProgress]:
+        """Удаление порциями, по шагу генератора на порцию.
+
+        Подходящие id находятся один раз, затем порции по chunk_size id
+        удаляются отдельными транзакциями, поэтому между шагами SQLite
+        свободен для читателей, а поиск (например FTS) не повторяется.
+        Игроки, добавленные после начала удаления, не затрагиваются. Для
+        файловых источников шаг один: файл помечается или переписывается
+        за один проход.
+        """
+        query = Crud._query(criteria)
+        if not query:
+            return
+        if Crud.data_source != "db":
+            yield DeleteProgress(Crud.delete(query), 1.0)
+            return
+
+        with Crud._connection() as connection:
+            ids = connection.execute(*query.statement("ids")).scalars().all()
+        kind = "tombstone" if Crud.soft_delete else "delete"
+        yield from Crud._delete_ids_in_chunks(ids, kind, chunk_size)
+
+    @staticmethod
+    def _delete_ids_in_chunks(
+        ids: List[int], kind: str, chunk_size: int = None
+    ) -> Iterator[DeleteProgress]:
+        """Строки с id из списка порциями по chunk_size, каждая в своей транзакции.
+
+        kind: "tombstone" - пометить живые, "delete" - удалить живые,
+        "purge" - удалить помеченные (количество живых не меняется).
+        """
+        chunk_size = chunk_size or Crud.DELETE_CHUNK_SIZE
+        deleted = 0
+        for start in range(0, len(ids), chunk_size):
+            wanted = Player.id.in_(Crud._id_list(ids[start : start + chunk_size]))
+            if kind == "tombstone":
+                statement = (
+                    update(Player)
+                    .where(LIVE, wanted)
+                    .values(deleted_at=func.current_timestamp())
+                )
+            elif kind == "delete":
+                statement = delete(Player).where(LIVE, wanted)
+            else:
+                statement = delete(Player).where(Player.deleted_at.is_not(None), wanted)
+            with Crud._connection() as connection:
+                count = connection.execute(statement).rowcount
+            if kind != "purge":
+                Crud._data_changed(-count)
+            deleted += count
+            yield DeleteProgress(deleted, min(start + chunk_size, len(ids)) / len(ids))
@@ -1,12 +1,87 @@
 import enum
 import os
-from sqlalchemy import create_engine, Column, Integer, String, Enum, Date
+from sqlalchemy import (
+    create_engine,
+    event,
+    inspect,
+    text,
+    Column,
+    Integer,
+    String,
+    Enum,
+    Date,
+    DateTime,
+    Index,
+    MetaData,
+    Table,
+)
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import sessionmaker, declarative_base
+from models.instrumentation import instrumentation
 
 basedir = os.path.abspath(os.path.dirname(__file__))
 db_path = os.path.join(basedir, "football_players.db")
 
-engine = create_engine(f"sqlite:///{db_path}", echo=True)
+# Вывод каждого запроса в stdout и сбор статистики запросов включаются явно
+DB_ECHO = os.environ.get("FOOTBALL_DB_ECHO") == "1"
+DB_INSTRUMENT = os.environ.get("FOOTBALL_DB_INSTRUMENT") == "1"
+
+# Наборы PRAGMA для каждого нового соединения. fast: WAL с synchronous=NORMAL
+# (fsync только при checkpoint, база не повреждается при сбое, но последние
+# транзакции могут потеряться при отключении питания), крупный кэш и mmap.
+# safe: WAL с fsync на каждый commit, умеренный кэш, без mmap
+SQLITE_PROFILES = {
+    "safe": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "cache_size": -16000,
+        "temp_store": "MEMORY",
+        "mmap_size": 0,
+    },
+    "fast": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -64000,
+        "temp_store": "MEMORY",
+        "mmap_size": 256 * 1024 * 1024,
+    },
+}
+DB_PROFILE = os.environ.get("FOOTBALL_DB_PROFILE", "fast")
+if DB_PROFILE not in SQLITE_PROFILES:
+    raise ValueError(f"Неизвестный профиль SQLite: {DB_PROFILE}")
+
+engine = create_engine(
+    f"sqlite:///{db_path}",
+    echo=DB_ECHO,
+    # Соединения берёт фоновый поток, поэтому проверка потока у sqlite3 снята;
+    # cached_statements - кэш подготовленных запросов в каждом соединении
+    connect_args={"check_same_thread": False, "cached_statements": 256},
+    pool_size=4,
+    max_overflow=4,
+    # Кэш скомпилированных SQLAlchemy запросов
+    query_cache_size=1000,
+)
+if DB_INSTRUMENT:
+    instrumentation.install(engine)
+
+
+@event.listens_for(engine, "connect")
+def apply_sqlite_profile(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PROFILES[DB_PROFILE].items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
+def set_sqlite_profile(profile: str):
+    """Переключает профиль: пул закрывает соединения, новые получат новые PRAGMA"""
+    global DB_PROFILE
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"Неизвестный профиль SQLite: {profile}")
+    DB_PROFILE = profile
+    engine.dispose()
+
+
 Base = declarative_base()
 
 
@@ -23,17 +98,175 @@ class TeamType(enum.Enum):
     NA = "n/a"
 
 
+def casefolded(source: str):
+    """Значение по умолчанию для теневой колонки: casefold() исходной колонки"""
+
+    def default(context):
+        value = context.get_current_parameters().get(source)
+        return value.casefold() if value else value
+
+    return default
+
+
 class Player(Base):
     __tablename__ = "players"
 
     id = Column(Integer, primary_key=True)
     full_name = Column(String(150), nullable=False)
-    birth_date = Column(Date, nullable=False)
-    football_team = Column(String(100))
-    home_city = Column(String(50))
-    team_type = Column(Enum(TeamType))
-    position = Column(Enum(PlayerPosition))
+    birth_date = Column(Date, nullable=False, index=True)
+    football_team = Column(String(100), index=True)
+    home_city = Column(String(50), index=True)
+    team_type = Column(Enum(TeamType), index=True)
+    position = Column(Enum(PlayerPosition), index=True)
+
+    # Теневые колонки в casefold(): SQLite не умеет сворачивать регистр кириллицы.
+    # onupdate не задан: UPDATE без исходной колонки (пометка deleted_at)
+    # обнулил бы теневую, поэтому меняющий ФИО, команду или город UPDATE
+    # задаёт теневые колонки сам
+    full_name_cf = Column(String(150), default=casefolded("full_name"))
+    football_team_cf = Column(
+        String(100), index=True, default=casefolded("football_team")
+    )
+    home_city_cf = Column(String(50), index=True, default=casefolded("home_city"))
+
+    # Метка мягкого удаления: такие строки не читаются и ждут очистки.
+    # Обычный индекс по deleted_at планировщик выбирал вместо индексов поиска
+    # ради условия deleted_at IS NULL, поэтому индексируются только помеченные
+    deleted_at = Column(DateTime)
+
+    __table_args__ = (
+        Index(
+            "ix_players_tombstones",
+            "id",
+            sqlite_where=deleted_at.is_not(None),
+        ),
+    )
+
+
+SHADOW_COLUMNS = {
+    "full_name_cf": "full_name",
+    "football_team_cf": "football_team",
+    "home_city_cf": "home_city",
+}
+
+
+# Колонки, добавленные после первой версии схемы без заполнения значений
+ADDED_COLUMNS = ("deleted_at",)
+# Индексы прежних версий схемы, которые мешают планировщику
+DROPPED_INDEXES = ("ix_players_deleted_at",)
+
+
+def migrate():
+    """Добавляет новые колонки и индексы в базу, созданную до их появления"""
+    inspector = inspect(engine)
+    existing = {column["name"] for column in inspector.get_columns("players")}
+    missing = [name for name in SHADOW_COLUMNS if name not in existing]
+    added = [name for name in ADDED_COLUMNS if name not in existing]
+    indexes = {index["name"] for index in inspector.get_indexes("players")}
+
+    with engine.begin() as connection:
+        for name in missing + added:
+            column_type = Player.__table__.c[name].type.compile(engine.dialect)
+            connection.execute(
+                text(f"ALTER TABLE players ADD COLUMN {name} {column_type}")
+            )
+
+        if missing:
+            sources = ", ".join(SHADOW_COLUMNS.values())
+            rows = connection.execute(text(f"SELECT id, {sources} FROM players"))
+            updates = []
+            for row in rows:
+                values = {"row_id": row.id}
+                for shadow, source in SHADOW_COLUMNS.items():
+                    value = getattr(row, source)
+                    values[shadow] = value.casefold() if value else value
+                updates.append(values)
+            if updates:
+                assignments = ", ".join(f"{name} = :{name}" for name in SHADOW_COLUMNS)
+                connection.execute(
+                    text(f"UPDATE players SET {assignments} WHERE id = :row_id"),
+                    updates,
+                )
+
+        for name in DROPPED_INDEXES:
+            if name in indexes:
+                connection.execute(text(f"DROP INDEX {name}"))
+
+    for index in Player.__table__.indexes:
+        if index.name not in indexes:
+            index.create(engine)
+
+
+# Полнотекстовый индекс FTS5 (триграммы) по full_name_cf. Таблица описана
+# в отдельной MetaData, чтобы create_all не пытался создать её как обычную
+fts_metadata = MetaData()
+players_fts = Table(
+    "players_fts",
+    fts_metadata,
+    Column("rowid", Integer),
+    Column("full_name_cf", String),
+)
+# Триграммный токенизатор не находит подстроки короче трёх символов
+FTS_MIN_QUERY_LENGTH = 3
+
+FTS_UPDATE_TRIGGER = """CREATE TRIGGER IF NOT EXISTS players_fts_au
+    AFTER UPDATE OF full_name_cf ON players BEGIN
+        INSERT INTO players_fts(players_fts, rowid, full_name_cf)
+        VALUES ('delete', old.id, old.full_name_cf);
+        INSERT INTO players_fts(rowid, full_name_cf)
+        VALUES (new.id, new.full_name_cf);
+    END"""
+
+FTS_DDL = [
+    """CREATE VIRTUAL TABLE players_fts USING fts5(
+        full_name_cf, content='players', content_rowid='id', tokenize='trigram'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS players_fts_ai AFTER INSERT ON players BEGIN
+        INSERT INTO players_fts(rowid, full_name_cf)
+        VALUES (new.id, new.full_name_cf);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS players_fts_ad AFTER DELETE ON players BEGIN
+        INSERT INTO players_fts(players_fts, rowid, full_name_cf)
+        VALUES ('delete', old.id, old.full_name_cf);
+    END""",
+    FTS_UPDATE_TRIGGER,
+    "INSERT INTO players_fts(players_fts) VALUES ('rebuild')",
+]
+
+
+def update_fulltext_trigger():
+    """Пересоздаёт триггер обновления, срабатывавший на любую колонку.
+
+    Мягкое удаление меняет только deleted_at и не должно переиндексировать ФИО.
+    """
+    with engine.begin() as connection:
+        definition = connection.execute(
+            text(
+                "SELECT sql FROM sqlite_master "
+                "WHERE type = 'trigger' AND name = 'players_fts_au'"
+            )
+        ).scalar()
+        if definition is None or "UPDATE OF" not in definition:
+            connection.execute(text("DROP TRIGGER IF EXISTS players_fts_au"))
+            connection.execute(text(FTS_UPDATE_TRIGGER))
+
+
+def create_fulltext_index() -> bool:
+    """Создаёт FTS5-таблицу и триггеры синхронизации, если SQLite их поддерживает"""
+    if inspect(engine).has_table("players_fts"):
+        update_fulltext_trigger()
+        return True
+    try:
+        with engine.begin() as connection:
+            for statement in FTS_DDL:
+                connection.execute(text(statement))
+    except OperationalError:
+        # SQLite собран без FTS5 или без триграммного токенизатора (< 3.34)
+        return False
+    return True
 
 
 Base.metadata.create_all(engine)
+migrate()
+FTS_AVAILABLE = create_fulltext_index()
 Session = sessionmaker(bind=engine)
@@ -0,0 +1,42 @@
+import os
+import stat
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+
+def file_mode(path: Path) -> int:
+    """Права для файла, заменяющего path: как у него или как у нового файла.
+
+    mkstemp создаёт файл с правами 0600, а os.replace их сохраняет.
+    """
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+
+@contextmanager
+def atomic_file(path: Path, mode: int = None):
+    """Временный файл рядом с path: fsync и замена при успехе.
+
+    Права - mode или права заменяемого файла.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    try:
+        os.chmod(tmp_path, file_mode(path) if mode is None else mode)
+        with os.fdopen(fd, "wb") as file:
+            yield file
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def atomic_write(path: Path, data: bytes, mode: int = None):
+    with atomic_file(path, mode) as file:
+        file.write(data)
@@ -0,0 +1,104 @@
+from datetime import date
+from typing import Optional
+from models.database import TeamType, PlayerPosition
+from models.query import Condition, any_of
+
+
+class PlayerFilter:
+    """Критерии поиска игроков, объединяемые через OR.
+
+    Строки сворачиваются через casefold() один раз при создании. Фильтр -
+    частный случай PlayerQuery: condition() даёт его дерево условий.
+    """
+
+    FIELDS = ("name_part", "birth_date", "position", "team_type", "team", "city")
+
+    def __init__(
+        self,
+        name_part: str = None,
+        birth_date: date = None,
+        position: PlayerPosition = None,
+        team_type: TeamType = None,
+        team: str = None,
+        city: str = None,
+    ):
+        self.name_part = name_part.casefold() if name_part else None
+        self.birth_date = birth_date or None
+        self.position = position or None
+        self.team_type = team_type or None
+        self.team = team.casefold() if team else None
+        self.city = city.casefold() if city else None
+        self._row_predicate = None
+
+    @classmethod
+    def from_criteria(cls, criteria: dict = None) -> "PlayerFilter":
+        return cls(**{key: value for key, value in (criteria or {}).items() if value})
+
+    def is_empty(self) -> bool:
+        return not any(getattr(self, field) for field in self.FIELDS)
+
+    def __bool__(self):
+        return not self.is_empty()
+
+    def key(self) -> tuple:
+        """Нормализованное представление для сравнения и кэширования"""
+        return tuple(getattr(self, field) for field in self.FIELDS)
+
+    def __eq__(self, other):
+        return isinstance(other, PlayerFilter) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def __repr__(self):
+        values = ", ".join(
+            f"{field}={getattr(self, field)!r}"
+            for field in self.FIELDS
+            if getattr(self, field)
+        )
+        return f"PlayerFilter({values})"
+
+    def refines(self, other: "PlayerFilter") -> bool:
+        """Все игроки, найденные этим фильтром, найдены и фильтром other.
+
+        Критерии объединяются через OR, поэтому каждый критерий должен
+        совпадать с прежним, сужать его или исчезнуть. Новый критерий
+        расширяет выборку.
+        """
+        if self.is_empty() or other.is_empty():
+            return False
+        for field in self.FIELDS:
+            new, old = getattr(self, field), getattr(other, field)
+            if new == old or not new:
+                continue
+            if not old:
+                return False
+            if field == "name_part" and old in new:
+                continue
+            if field in ("team", "city") and new.startswith(old):
+                continue
+            return False
+        return True
+
+    def condition(self) -> Optional[Condition]:
+        """Условие PlayerQuery: OR заданных критериев или None"""
+        return any_of(
+            full_name=self.name_part,
+            birth_date=self.birth_date,
+            position=self.position,
+            team_type=self.team_type,
+            football_team=self.team,
+            home_city=self.city,
+        )
+
+    def matches(self, player) -> bool:
+        """Проверка уже загруженного игрока, та же семантика, что у Crud.search"""
+        # Фильтр не меняется после создания, предикат собирается один раз
+        if self._row_predicate is None:
+            condition = self.condition()
+            self._row_predicate = (
+                condition.row_predicate()
+                if condition is not None
+                else lambda player: True
+            )
+        return self._row_predicate(player)
@@ -0,0 +1,170 @@
+import json
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import event
+
+# Верхние границы корзин гистограммы задержек, мс; последняя корзина - выше
+LATENCY_BUCKETS_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000)
+
+
+class StatementStats:
+    __slots__ = ("count", "total_ms", "max_ms", "changed_rows", "histogram")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        # Строки, изменённые INSERT/UPDATE/DELETE; None - запрос их не меняет
+        self.changed_rows = None
+        self.histogram = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def add(self, elapsed_ms: float, changed_rows: Optional[int]):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        if changed_rows is not None:
+            self.changed_rows = (self.changed_rows or 0) + changed_rows
+        self.histogram[bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+
+    def percentile_ms(self, fraction: float) -> float:
+        """Оценка перцентиля по гистограмме: верхняя граница нужной корзины"""
+        needed = fraction * self.count
+        seen = 0
+        for bound, hits in zip(LATENCY_BUCKETS_MS, self.histogram):
+            seen += hits
+            if seen >= needed:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "total_ms": round(self.total_ms, 3),
+            "avg_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "p95_ms": round(self.percentile_ms(0.95), 3),
+            "max_ms": round(self.max_ms, 3),
+            "changed_rows": self.changed_rows,
+            "histogram": dict(
+                zip(
+                    [f"<={bound}" for bound in LATENCY_BUCKETS_MS] + ["more"],
+                    self.histogram,
+                )
+            ),
+        }
+
+
+class QueryInstrumentation:
+    """Сбор задержек SQL через события before/after_cursor_execute.
+
+    Для каждого текста запроса ведётся гистограмма задержек и число
+    изменённых строк - только у INSERT, UPDATE и DELETE: для SELECT драйвер
+    SQLite сообщает rowcount -1, а не число прочитанных строк. Запросы
+    дольше slow_threshold_ms сохраняются образцами вместе с параметрами.
+    """
+
+    MAX_PARAMETERS_LENGTH = 200
+
+    def __init__(self, slow_threshold_ms: float = 100.0, max_slow_samples: int = 20):
+        self.slow_threshold_ms = slow_threshold_ms
+        self.statements = {}
+        self.slow_samples = deque(maxlen=max_slow_samples)
+        self.started_at = datetime.now()
+        self.engine = None
+        # Запросы выполняются в фоновом потоке, а отчёт читается из потока Tk
+        self.lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.engine is not None
+
+    def install(self, engine):
+        if self.engine is not None:
+            return
+        event.listen(engine, "before_cursor_execute", self.before_execute)
+        event.listen(engine, "after_cursor_execute", self.after_execute)
+        event.listen(engine, "handle_error", self.on_error)
+        self.engine = engine
+
+    def uninstall(self):
+        if self.engine is None:
+            return
+        event.remove(self.engine, "before_cursor_execute", self.before_execute)
+        event.remove(self.engine, "after_cursor_execute", self.after_execute)
+        event.remove(self.engine, "handle_error", self.on_error)
+        self.engine = None
+
+    def before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    def after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get("query_started")
+        if not started:
+            # Сбор включён из потока Tk, пока этот запрос уже выполнялся
+            return
+        elapsed_ms = (time.perf_counter() - started.pop()) * 1000
+        changed_rows = cursor.rowcount if cursor.rowcount >= 0 else None
+        key = self.normalize(statement)
+
+        with self.lock:
+            stats = self.statements.get(key)
+            if stats is None:
+                stats = self.statements[key] = StatementStats()
+            stats.add(elapsed_ms, changed_rows)
+            if elapsed_ms >= self.slow_threshold_ms:
+                self.slow_samples.append(
+                    {
+                        "at": datetime.now().isoformat(timespec="seconds"),
+                        "elapsed_ms": round(elapsed_ms, 3),
+                        "statement": key,
+                        "parameters": repr(parameters)[: self.MAX_PARAMETERS_LENGTH],
+                        "executemany": executemany,
+                    }
+                )
+
+    def on_error(self, context):
+        # Упавший запрос не доходит до after_cursor_execute
+        if context.connection is not None and context.cursor is not None:
+            started = context.connection.info.get("query_started")
+            if started:
+                started.pop()
+
+    @staticmethod
+    def normalize(statement: str) -> str:
+        return re.sub(r"\s+", " ", statement).strip()
+
+    def reset(self):
+        with self.lock:
+            self.statements.clear()
+            self.slow_samples.clear()
+            self.started_at = datetime.now()
+
+    def report(self) -> dict:
+        with self.lock:
+            statements = [
+                {"statement": statement, **stats.to_dict()}
+                for statement, stats in self.statements.items()
+            ]
+            slow_samples = list(self.slow_samples)
+        statements.sort(key=lambda item: item["total_ms"], reverse=True)
+        return {
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "enabled": self.enabled,
+            "slow_threshold_ms": self.slow_threshold_ms,
+            "statements": statements,
+            "slow_samples": slow_samples,
+        }
+
+    def dump(self, path: str, extra: dict = None):
+        """Сохраняет отчёт в JSON; extra - дополнительные разделы отчёта"""
+        report = self.report()
+        report.update(extra or {})
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2, default=str)
+
+
+instrumentation = QueryInstrumentation()
@@ -0,0 +1,563 @@
+import operator
+from bisect import bisect_left, bisect_right
+from enum import Enum
+from functools import lru_cache
+from itertools import count
+from typing import Callable, Iterable, List, Optional, Tuple
+from sqlalchemy import (
+    String,
+    and_,
+    bindparam,
+    delete,
+    func,
+    or_,
+    select,
+    tuple_,
+    type_coerce,
+    update,
+)
+from models.database import (
+    Player,
+    players_fts,
+    FTS_AVAILABLE,
+    FTS_MIN_QUERY_LENGTH,
+)
+
+# Верхняя граница диапазона для префиксного поиска по строкам
+PREFIX_UPPER_BOUND = "\U0010ffff"
+
+# Колонки PlayerRow: перечисления читаются как имена и превращаются в коды
+ROW_COLUMNS = (
+    Player.id,
+    Player.full_name,
+    Player.birth_date,
+    Player.football_team,
+    Player.home_city,
+    type_coerce(Player.team_type, String),
+    type_coerce(Player.position, String),
+    Player.full_name_cf,
+)
+
+# Помеченные удалёнными строки не видны ни одному запросу
+LIVE = Player.deleted_at.is_(None)
+
+# Поле -> (колонка, свёрнутая колонка для строк, вид значения)
+FIELDS = {
+    "id": (Player.id, None, "int"),
+    "full_name": (Player.full_name, Player.full_name_cf, "text"),
+    "birth_date": (Player.birth_date, None, "date"),
+    "football_team": (Player.football_team, Player.football_team_cf, "text"),
+    "home_city": (Player.home_city, Player.home_city_cf, "text"),
+    "team_type": (Player.team_type, None, "enum"),
+    "position": (Player.position, None, "enum"),
+}
+# Допустимые операции для каждого вида значения
+OPERATIONS = {
+    "text": ("eq", "prefix", "contains"),
+    "date": ("eq", "lt", "le", "gt", "ge"),
+    "int": ("eq", "lt", "le", "gt", "ge"),
+    "enum": ("eq",),
+}
+COMPARISONS = {
+    "eq": operator.eq,
+    "lt": operator.lt,
+    "le": operator.le,
+    "gt": operator.gt,
+    "ge": operator.ge,
+}
+
+
+def _make_test(op: str, value) -> Callable:
+    """Проверка уже нормализованного значения поля"""
+    if op == "prefix":
+        return lambda found: found.startswith(value)
+    if op == "contains":
+        return lambda found: value in found
+    compare = COMPARISONS[op]
+    return lambda found: found is not None and compare(found, value)
+
+
+class Condition:
+    """Узел условия поиска: поле с операцией или AND/OR других условий.
+
+    Форма условия (shape) не содержит значений, поэтому запросы одной формы
+    собираются в SQL один раз, а значения уходят параметрами.
+    """
+
+    def __and__(self, other: "Condition") -> "Condition":
+        return All(self, other)
+
+    def __or__(self, other: "Condition") -> "Condition":
+        return Any(self, other)
+
+    def shape(self) -> tuple:
+        raise NotImplementedError
+
+    def sql_values(self) -> list:
+        """Значения параметров SQL в порядке обхода формы"""
+        raise NotImplementedError
+
+    def key(self) -> tuple:
+        return self.shape(), tuple(self.sql_values())
+
+    def __eq__(self, other):
+        return isinstance(other, Condition) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def row_predicate(self) -> Callable:
+        """Предикат над PlayerRow"""
+        raise NotImplementedError
+
+    def record_predicate(self) -> Callable:
+        """Предикат над словарём текстовых полей записи XML"""
+        raise NotImplementedError
+
+    def cache_rows(self, cache) -> set:
+        """Позиции строк XMLCache, подходящих под условие"""
+        raise NotImplementedError
+
+
+class Match(Condition):
+    """Сравнение одного поля; строки сравниваются без учёта регистра"""
+
+    def __init__(self, field: str, op: str, value):
+        if field not in FIELDS:
+            raise ValueError(f"Неизвестное поле: {field}")
+        kind = FIELDS[field][2]
+        if op not in OPERATIONS[kind]:
+            raise ValueError(f"Операция {op} недоступна для поля {field}")
+        self.field = field
+        self.op = op
+        self.kind = kind
+        self.value = value.casefold() if kind == "text" else value
+
+    def __repr__(self):
+        return f"Match({self.field!r}, {self.op!r}, {self.value!r})"
+
+    def uses_fts(self) -> bool:
+        return (
+            self.op == "contains"
+            and self.field == "full_name"
+            and FTS_AVAILABLE
+            and len(self.value) >= FTS_MIN_QUERY_LENGTH
+        )
+
+    def shape(self) -> tuple:
+        variant = "fts" if self.uses_fts() else None
+        return ("match", self.field, self.op, variant)
+
+    def sql_values(self) -> list:
+        if self.op == "prefix":
+            return [self.value, self.value + PREFIX_UPPER_BOUND]
+        if self.op == "contains":
+            if self.uses_fts():
+                return ['"' + self.value.replace('"', '""') + '"']
+            escaped = (
+                self.value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            )
+            return [f"%{escaped}%"]
+        return [self.value]
+
+    def row_predicate(self) -> Callable:
+        test = _make_test(self.op, self.value)
+        field = self.field
+        if field == "full_name":
+            # Игроки из БД уже несут свёрнутое ФИО, игроки из XML - нет
+            return lambda player: test(
+                player.full_name_cf or player.full_name.casefold()
+            )
+        if self.kind == "text":
+            return lambda player: test((getattr(player, field) or "").casefold())
+        return lambda player: test(getattr(player, field))
+
+    def record_predicate(self) -> Callable:
+        # Значение приводится к виду записи XML один раз, а не на каждой строке
+        field = self.field
+        if self.kind == "text":
+            test = _make_test(self.op, self.value)
+            return lambda record: test((record.get(field) or "").casefold())
+        if self.kind == "date":
+            test = _make_test(self.op, self.value.isoformat())
+        elif self.kind == "enum":
+            test = _make_test(self.op, self.value.value)
+        else:
+            test = _make_test(self.op, self.value)
+        return lambda record: test(record.get(field))
+
+    def cache_rows(self, cache) -> set:
+        if self.field == "full_name":
+            test = _make_test(self.op, self.value)
+            return {row for row, name in enumerate(cache.full_name_cf) if test(name)}
+        if self.field == "id":
+            # Идентификатор строки XML - её позиция плюс один
+            test = _make_test(self.op, self.value)
+            return {row for row in range(len(cache)) if test(row + 1)}
+        if self.op == "eq" and self.kind != "text":
+            return set(cache.lookup(self.field, self.value))
+        test = _make_test(self.op, self.value)
+        if self.kind == "text":
+            return cache.index_rows(self.field, lambda key: test(key.casefold()))
+        return cache.index_rows(self.field, test)
+
+
+class _Group(Condition):
+    KIND = None
+
+    def __init__(self, *conditions: Condition):
+        flat = []
+        for condition in conditions:
+            if condition is None:
+                continue
+            # Вложенные узлы того же вида разворачиваются: (a | b) | c == a | b | c
+            if type(condition) is type(self):
+                flat.extend(condition.conditions)
+            else:
+                flat.append(condition)
+        if not flat:
+            raise ValueError("Пустая группа условий")
+        self.conditions = tuple(flat)
+
+    def __repr__(self):
+        return f"{type(self).__name__}{self.conditions!r}"
+
+    def shape(self) -> tuple:
+        return (self.KIND, tuple(condition.shape() for condition in self.conditions))
+
+    def sql_values(self) -> list:
+        return [
+            value for condition in self.conditions for value in condition.sql_values()
+        ]
+
+
+class All(_Group):
+    """Все условия сразу (AND)"""
+
+    KIND = "and"
+
+    def row_predicate(self) -> Callable:
+        checks = [condition.row_predicate() for condition in self.conditions]
+        return lambda player: all(check(player) for check in checks)
+
+    def record_predicate(self) -> Callable:
+        checks = [condition.record_predicate() for condition in self.conditions]
+        return lambda record: all(check(record) for check in checks)
+
+    def cache_rows(self, cache) -> set:
+        rows = None
+        for condition in self.conditions:
+            found = condition.cache_rows(cache)
+            rows = found if rows is None else rows & found
+            if not rows:
+                break
+        return rows
+
+
+class Any(_Group):
+    """Хотя бы одно из условий (OR)"""
+
+    KIND = "or"
+
+    def row_predicate(self) -> Callable:
+        checks = [condition.row_predicate() for condition in self.conditions]
+        return lambda player: any(check(player) for check in checks)
+
+    def record_predicate(self) -> Callable:
+        checks = [condition.record_predicate() for condition in self.conditions]
+        return lambda record: any(check(record) for check in checks)
+
+    def cache_rows(self, cache) -> set:
+        rows = set()
+        for condition in self.conditions:
+            rows |= condition.cache_rows(cache)
+        return rows
+
+
+class Field:
+    """Построитель условий: Field("position") == PlayerPosition.GOALKEEPER"""
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __eq__(self, value) -> Match:
+        return Match(self.name, "eq", value)
+
+    def __lt__(self, value) -> Match:
+        return Match(self.name, "lt", value)
+
+    def __le__(self, value) -> Match:
+        return Match(self.name, "le", value)
+
+    def __gt__(self, value) -> Match:
+        return Match(self.name, "gt", value)
+
+    def __ge__(self, value) -> Match:
+        return Match(self.name, "ge", value)
+
+    __hash__ = None
+
+    def startswith(self, prefix: str) -> Match:
+        return Match(self.name, "prefix", prefix)
+
+    def contains(self, part: str) -> Match:
+        return Match(self.name, "contains", part)
+
+
+def _clause(shape: tuple, param: Callable):
+    """Условие SQL по форме; param(type_) выдаёт следующий параметр"""
+    if shape[0] == "and":
+        return and_(*(_clause(part, param) for part in shape[1]))
+    if shape[0] == "or":
+        return or_(*(_clause(part, param) for part in shape[1]))
+
+    _, field, op, variant = shape
+    column, folded, _ = FIELDS[field]
+    if folded is not None:
+        column = folded
+    if op == "prefix":
+        # Диапазон вместо LIKE, чтобы SQLite использовал индекс
+        return and_(column >= param(column.type), column < param(column.type))
+    if op == "contains" and variant == "fts":
+        # Подстрока ФИО через триграммный FTS5-индекс
+        matches = select(players_fts.c.rowid).where(
+            players_fts.c.full_name_cf.op("MATCH")(param(String()))
+        )
+        return Player.id.in_(matches)
+    if op == "contains":
+        return column.like(param(column.type), escape="\\")
+    return COMPARISONS[op](column, param(column.type))
+
+
+def _numbered(prefix: str) -> Callable:
+    names = count()
+    return lambda type_: bindparam(f"{prefix}{next(names)}", type_=type_)
+
+
+def _sort_column(name: str):
+    return FIELDS[name][0]
+
+
+def _order(order_by: Tuple[str, ...]) -> list:
+    return [
+        _sort_column(name[1:]).desc() if name.startswith("-") else _sort_column(name)
+        for name in order_by
+    ]
+
+
+@lru_cache(maxsize=256)
+def _statement(kind: str, where: tuple, order_by: tuple, paged: tuple, seek: tuple):
+    """SQL для формы запроса; одинаковые формы получают один и тот же объект,
+    поэтому SQLAlchemy берёт скомпилированный текст из своего кэша."""
+    columns = ROW_COLUMNS if kind == "rows" else (Player.id,)
+    statement = select(*columns).where(LIVE)
+    condition = _clause(where, _numbered("p")) if where is not None else None
+    if condition is not None:
+        statement = statement.where(condition)
+    if seek is not None:
+        direction, sort_key = seek
+        compare = operator.gt if direction == "after" else operator.lt
+        if sort_key == "id":
+            statement = statement.where(
+                compare(Player.id, bindparam("s1", type_=Player.id.type))
+            )
+        else:
+            column = _sort_column(sort_key)
+            cursor = tuple_(
+                bindparam("s0", type_=column.type),
+                bindparam("s1", type_=Player.id.type),
+            )
+            statement = statement.where(compare(tuple_(column, Player.id), cursor))
+    limited, offset = paged
+    if kind != "count" or limited or offset:
+        statement = statement.order_by(*_order(order_by))
+    if limited:
+        statement = statement.limit(bindparam("limit"))
+    if offset:
+        statement = statement.offset(bindparam("offset"))
+
+    if kind == "count":
+        if limited or offset:
+            return select(func.count()).select_from(statement.subquery())
+        return statement.with_only_columns(func.count(Player.id))
+    if kind in ("delete", "tombstone"):
+        if not (limited or offset or seek):
+            target = and_(LIVE, condition)
+        else:
+            target = Player.id.in_(statement)
+        if kind == "delete":
+            return delete(Player).where(target)
+        return update(Player).where(target).values(deleted_at=func.current_timestamp())
+    return statement
+
+
+class PlayerQuery:
+    """Поиск игроков: условие, порядок, курсор и ограничения.
+
+    Один и тот же запрос компилируется в SELECT/DELETE для SQLite (готовые
+    выражения кэшируются по форме) и в предикаты для XML. Порядок задаётся
+    именами полей, "-" в начале означает убывание; id добавляется в конец
+    для однозначности.
+    """
+
+    def __init__(
+        self,
+        where: Optional[Condition] = None,
+        order_by: Iterable[str] = ("id",),
+        limit: int = None,
+        offset: int = None,
+        seek: tuple = None,
+    ):
+        order_by = tuple(order_by)
+        for name in order_by:
+            if name.lstrip("-") not in FIELDS:
+                raise ValueError(f"Неизвестное поле сортировки: {name}")
+        if not any(name.lstrip("-") == "id" for name in order_by):
+            descending = bool(order_by) and order_by[-1].startswith("-")
+            order_by += ("-id" if descending else "id",)
+        if seek is not None and seek[0] not in ("after", "before"):
+            raise ValueError(f"Неизвестное направление курсора: {seek[0]}")
+        self.where = where
+        self.order_by = order_by
+        self.limit = limit
+        self.offset = offset or None
+        # (направление "after"/"before", ключ сортировки, курсор (значение, id))
+        self.seek = seek
+
+    def replace(self, **changes) -> "PlayerQuery":
+        values = {
+            "where": self.where,
+            "order_by": self.order_by,
+            "limit": self.limit,
+            "offset": self.offset,
+            "seek": self.seek,
+        }
+        values.update(changes)
+        return PlayerQuery(**values)
+
+    def is_empty(self) -> bool:
+        return self.where is None
+
+    def __bool__(self):
+        return not self.is_empty()
+
+    def key(self) -> tuple:
+        return (
+            self.where.key() if self.where is not None else None,
+            self.order_by,
+            self.limit,
+            self.offset,
+            self.seek,
+        )
+
+    def __eq__(self, other):
+        return isinstance(other, PlayerQuery) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def __repr__(self):
+        return (
+            f"PlayerQuery(where={self.where!r}, order_by={self.order_by!r}, "
+            f"limit={self.limit!r}, offset={self.offset!r}, seek={self.seek!r})"
+        )
+
+    # SQL
+
+    def statement(self, kind: str = "rows"):
+        """Пара (выражение, параметры).
+
+        kind - rows, ids, count, delete или tombstone (пометка deleted_at).
+        """
+        if kind not in ("rows", "ids", "count", "delete", "tombstone"):
+            raise ValueError(f"Неизвестный вид запроса: {kind}")
+        if kind in ("delete", "tombstone") and self.is_empty():
+            raise ValueError("Удаление без условия не поддерживается")
+
+        where = self.where.shape() if self.where is not None else None
+        seek = self.seek[:2] if self.seek is not None else None
+        paged = (self.limit is not None, self.offset is not None)
+        statement = _statement(kind, where, self.order_by, paged, seek)
+
+        parameters = {}
+        if self.where is not None:
+            parameters.update(
+                (f"p{number}", value)
+                for number, value in enumerate(self.where.sql_values())
+            )
+        if self.seek is not None:
+            parameters["s0"], parameters["s1"] = self.seek[2]
+        if self.limit is not None:
+            parameters["limit"] = self.limit
+        if self.offset is not None:
+            parameters["offset"] = self.offset
+        return statement, parameters
+
+    # В памяти и XML
+
+    def record_predicate(self) -> Callable:
+        if self.where is None:
+            return lambda record: True
+        return self.where.record_predicate()
+
+    def cache_rows(self, cache) -> set:
+        return self.where.cache_rows(cache)
+
+    def arrange(self, players: List) -> List:
+        """Сортировка и ограничения для уже отобранных игроков"""
+        if self.order_by != ("id",):
+            # Устойчивая сортировка по ключам с конца; None - в начале, как в SQLite
+            for name in reversed(self.order_by):
+                field = name.lstrip("-")
+
+                def sort_key(player, field=field):
+                    value = getattr(player, field)
+                    if isinstance(value, Enum):
+                        value = value.name
+                    return value is not None, value
+
+                players = sorted(players, key=sort_key, reverse=name.startswith("-"))
+        start = self.offset or 0
+        if self.limit is not None:
+            return players[start : start + self.limit]
+        return players[start:] if start else players
+
+
+def any_of(**criteria) -> Optional[Condition]:
+    """OR заданных полей с операцией по умолчанию; пустые значения пропускаются.
+
+    Для ФИО по умолчанию ищется подстрока, для команды и города - префикс.
+    """
+    defaults = {
+        "full_name": "contains",
+        "football_team": "prefix",
+        "home_city": "prefix",
+    }
+    matches = [
+        Match(field, defaults.get(field, "eq"), value)
+        for field, value in criteria.items()
+        if value
+    ]
+    return Any(*matches) if matches else None
+
+
+def seek_positions(
+    positions: List[int],
+    limit: int,
+    after_id: Optional[int] = None,
+    before_id: Optional[int] = None,
+    from_end: bool = False,
+) -> List[int]:
+    """Страница возрастающих позиций файлового источника по курсору id.
+
+    id = позиция + 1, поэтому курсор находится бинарным поиском.
+    """
+    if after_id is not None:
+        start = bisect_right(positions, after_id - 1)
+        return positions[start : start + limit]
+    if before_id is not None:
+        end = bisect_left(positions, before_id - 1)
+        return positions[max(0, end - limit) : end]
+    if from_end:
+        return positions[-limit:] if limit else []
+    return positions[:limit]
@@ -0,0 +1,62 @@
+from collections import OrderedDict
+from typing import Hashable, List, Optional
+
+
+class QueryCache:
+    """LRU кэш результатов запросов в виде списков id.
+
+    Ключ включает номер поколения: любая запись увеличивает его, и старые
+    элементы перестают находиться, а затем вытесняются как самые давние.
+    """
+
+    def __init__(self, max_entries: int = 128):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, *parts: Hashable) -> tuple:
+        return (self.generation, *parts)
+
+    def get(self, key: tuple) -> Optional[List[int]]:
+        ids = self.entries.get(key)
+        if ids is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return ids
+
+    def put(self, key: tuple, ids: List[int]):
+        # Ключ, созданный до записи, хранить уже незачем
+        if key[0] != self.generation:
+            return
+        self.entries[key] = ids
+        self.entries.move_to_end(key)
+        self._evict()
+
+    def _evict(self):
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self):
+        self.generation += 1
+
+    def resize(self, max_entries: int):
+        self.max_entries = max_entries
+        self._evict()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "generation": self.generation,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
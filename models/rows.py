@@ -0,0 +1,57 @@
+from collections import namedtuple
+from datetime import date
+from typing import Dict
+from models.database import TeamType, PlayerPosition
+
+TEAM_TYPES = tuple(TeamType)
+POSITIONS = tuple(PlayerPosition)
+
+# Код перечисления по тому, как оно хранится: имя в SQLite, значение в XML
+TEAM_TYPE_BY_NAME = {member.name: code for code, member in enumerate(TEAM_TYPES)}
+POSITION_BY_NAME = {member.name: code for code, member in enumerate(POSITIONS)}
+TEAM_TYPE_BY_VALUE = {member.value: code for code, member in enumerate(TEAM_TYPES)}
+POSITION_BY_VALUE = {member.value: code for code, member in enumerate(POSITIONS)}
+TEAM_TYPE_CODES = {member: code for code, member in enumerate(TEAM_TYPES)}
+POSITION_CODES = {member: code for code, member in enumerate(POSITIONS)}
+# Код пустого перечисления в колонках двоичного файла
+NO_CODE = -1
+
+
+class PlayerRow(
+    namedtuple(
+        "PlayerRow",
+        "id full_name birth_date football_team home_city "
+        "team_type_code position_code full_name_cf",
+    )
+):
+    """Строка игрока только для чтения: кортеж без состояния ORM.
+
+    Перечисления хранятся номерами членов, team_type и position
+    возвращают сами члены, как у Player.
+    """
+
+    __slots__ = ()
+
+    @property
+    def team_type(self):
+        code = self.team_type_code
+        return None if code is None else TEAM_TYPES[code]
+
+    @property
+    def position(self):
+        code = self.position_code
+        return None if code is None else POSITIONS[code]
+
+    @classmethod
+    def from_record(cls, row_id: int, data: Dict[str, str]) -> "PlayerRow":
+        """Строка из текстовых полей записи XML"""
+        return cls(
+            row_id,
+            data.get("full_name"),
+            date.fromisoformat(data["birth_date"]),
+            data.get("football_team") or None,
+            data.get("home_city") or None,
+            TEAM_TYPE_BY_VALUE.get(data.get("team_type")),
+            POSITION_BY_VALUE.get(data.get("position")),
+            None,
+        )
@@ -1,9 +1,42 @@
 # seed_db.py
 
+import argparse
+import time
 from faker import Faker
-from random import choice
+from random import choice, randint
 from datetime import date, timedelta
-from models.database import Session, Player, TeamType, PlayerPosition
+from models.crud import Crud
+from models.database import TeamType, PlayerPosition
+
+TEAMS = [
+    "Динамо",
+    "Спартак",
+    "Зенит",
+    "Рубин",
+    "ЦСКА",
+    "Локомотив",
+    "Урал",
+    "Ростов",
+    "Ахмат",
+    "Оренбург",
+]
+CITIES = [
+    "Минск",
+    "Брест",
+    "Новолукомль",
+    "Москва",
+    "Санкт-Петербург",
+    "Казань",
+    "Самара",
+    "Ростов-на-Дону",
+    "Краснодар",
+    "Уфа",
+    "Челябинск",
+    "Волгоград",
+    "Нижний Новгород",
+]
+# Faker генерирует ФИО медленно, поэтому для больших объёмов берём из пула
+NAME_POOL_SIZE = 5000
 
 
 def random_birthdate(start_year=1985, end_year=2007):
@@ -11,55 +44,52 @@ def random_birthdate(start_year=1985, end_year=2007):
     start = date(start_year, 1, 1)
     end = date(end_year, 12, 31)
     delta_days = (end - start).days
-    return start + timedelta(days=Faker().random_int(min=0, max=delta_days))
+    return start + timedelta(days=randint(0, delta_days))
 
 
-def main(n=100):
+def generate_players(n):
+    """Лениво генерирует n словарей с полями Player."""
     fake = Faker("ru_RU")
-    teams = [
-        "Динамо",
-        "Спартак",
-        "Зенит",
-        "Рубин",
-        "ЦСКА",
-        "Локомотив",
-        "Урал",
-        "Ростов",
-        "Ахмат",
-        "Оренбург",
-    ]
-    cities = [
-        "Минск",
-        "Брест",
-        "Новолукомль" "Москва",
-        "Санкт-Петербург",
-        "Казань",
-        "Самара",
-        "Ростов-на-Дону",
-        "Краснодар",
-        "Уфа",
-        "Челябинск",
-        "Волгоград",
-        "Нижний Новгород",
-    ]
-    session = Session()
+    names = [fake.name() for _ in range(min(n, NAME_POOL_SIZE))]
+    team_types = list(TeamType)
+    positions = list(PlayerPosition)
 
     for _ in range(n):
-        full_name = fake.name()
+        yield {
+            "full_name": choice(names),
+            "birth_date": random_birthdate(1985, 2007),
+            "football_team": choice(TEAMS),
+            "home_city": choice(CITIES),
+            "team_type": choice(team_types),
+            "position": choice(positions),
+        }
+
+
+def main(
+    n=100, chunk_size=Crud.BULK_CHUNK_SIZE, source="db", xml_file=None, bin_file=None
+):
+    if source == "xml" and xml_file:
+        Crud.change_xml_file(xml_file)
+    if source == "bin" and bin_file:
+        Crud.change_bin_file(bin_file)
+    Crud.set_data_source(source)
+
+    started = time.perf_counter()
+    added = Crud.add_many(generate_players(n), chunk_size)
+    elapsed = time.perf_counter() - started
+    print(f"Добавлено {added} записей в таблицу players за {elapsed:.1f} с")
 
-        player = Player(
-            full_name=full_name,
-            birth_date=random_birthdate(1985, 2007),
-            football_team=choice(teams),
-            home_city=choice(cities),
-            team_type=choice(list(TeamType)),
-            position=choice(list(PlayerPosition)),
-        )
-        session.add(player)
 
-    session.commit()
-    print(f"Добавлено {n} записей в таблицу players")
+def parse_args():
+    parser = argparse.ArgumentParser(description="Заполнение списка футболистов")
+    parser.add_argument("-n", "--count", type=int, default=50)
+    parser.add_argument("--chunk-size", type=int, default=Crud.BULK_CHUNK_SIZE)
+    parser.add_argument("--source", choices=["db", "xml", "bin"], default="db")
+    parser.add_argument("--xml-file", help="XML файл для источника xml")
+    parser.add_argument("--bin-file", help="Двоичный файл для источника bin")
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
-    main(50)
+    args = parse_args()
+    main(args.count, args.chunk_size, args.source, args.xml_file, args.bin_file)
@@ -0,0 +1,44 @@
+from collections import Counter
+from datetime import date
+from typing import Dict, Iterable, Tuple
+
+# Возрастные группы: (от, до не включая, подпись); None - без границы
+AGE_BUCKETS = (
+    (None, 20, "до 20"),
+    (20, 25, "20-24"),
+    (25, 30, "25-29"),
+    (30, 35, "30-34"),
+    (35, None, "35 и старше"),
+)
+# Разделы статистики в порядке показа
+STATS_SECTIONS = ("football_team", "position", "team_type", "home_city", "age")
+
+
+def age_on(birth_date: date, today: date) -> int:
+    return (
+        today.year
+        - birth_date.year
+        - ((today.month, today.day) < (birth_date.month, birth_date.day))
+    )
+
+
+def age_bucket(age: int) -> str:
+    for low, high, label in AGE_BUCKETS:
+        if (low is None or age >= low) and (high is None or age < high):
+            return label
+    raise ValueError(f"Возраст вне групп: {age}")
+
+
+def bucket_ages(
+    birth_date_counts: Iterable[Tuple[date, int]], today: date = None
+) -> Dict[str, int]:
+    """Количество по возрастным группам из пар (дата рождения, количество).
+
+    Различных дат рождения немного, поэтому группировка по дате делается
+    хранилищем, а здесь перебираются только сами даты.
+    """
+    today = today or date.today()
+    buckets = Counter({label: 0 for _, _, label in AGE_BUCKETS})
+    for birth_date, count in birth_date_counts:
+        buckets[age_bucket(age_on(birth_date, today))] += count
+    return dict(buckets)
@@ -1,13 +1,66 @@
+import os
 import xml.etree.ElementTree as ET
+from collections import Counter, deque
+from itertools import islice, takewhile
 from pathlib import Path
-from typing import List, Dict, Optional
-from datetime import datetime
-from models.database import Player, TeamType, PlayerPosition
+from typing import Iterable, List, Dict, Optional
+from models.database import Player
+from models.query import PlayerQuery, seek_positions
+from models.fileio import atomic_file
+from models.rows import PlayerRow
+from models.xml_cache import XMLCache, get_cache, store_cache, drop_cache
 
 
 class XMLAdapter:
-    def __init__(self, file_name: str = "models/players.xml"):
+    CLOSING_TAG = b"</players>"
+    OPENING_TAG = b"<players>"
+    PLAYER_CLOSING_TAG = b"</player>"
+    # Сколько байт с конца файла просматривать в поисках закрывающего тега
+    TAIL_SCAN_SIZE = 4096
+    # Файлы крупнее держатся только в потоковом режиме, без копии в памяти
+    MAX_CACHED_FILE_SIZE = 64 * 1024 * 1024
+
+    def __init__(self, file_name: str = "models/players.xml", use_cache: bool = True):
         self.xml_file = Path(file_name)
+        self.use_cache = use_cache
+
+    @property
+    def path(self) -> Path:
+        return self.xml_file
+
+    @property
+    def tombstones_file(self) -> Path:
+        """Файл пометок мягкого удаления: строка "#размер XML", затем номера
+        записей, по одному на строку
+        """
+        return self.xml_file.with_name(self.xml_file.name + ".deleted")
+
+    def tombstones(self) -> set:
+        """Номера записей, помеченных удалёнными.
+
+        XML между сжатиями только растёт дозаписью, поэтому файл меньше
+        запомненного в пометках размера - другой файл, и пометки отбрасываются.
+        """
+        self._ensure_file_exists()
+        try:
+            with open(self.tombstones_file, encoding="utf-8") as file:
+                header = file.readline()
+                ids = {int(line) for line in file if line.strip()}
+        except FileNotFoundError:
+            return set()
+        if header.startswith("#"):
+            if int(header[1:]) > self.xml_file.stat().st_size:
+                self.tombstones_file.unlink(missing_ok=True)
+                return set()
+        elif header.strip():
+            ids.add(int(header))
+        return ids
+
+    def _tombstones_signature(self):
+        try:
+            return XMLCache.stat_signature(self.tombstones_file)
+        except FileNotFoundError:
+            return None
 
     def set_file(self, file_path: str):
         self.xml_file = Path(file_path)
@@ -15,100 +68,401 @@ class XMLAdapter:
 
     def _ensure_file_exists(self):
         if not self.xml_file.exists():
-            root = ET.Element("players")
-            tree = ET.ElementTree(root)
-            tree.write(self.xml_file, encoding="utf-8", xml_declaration=True)
+            # Пометки от удалённого файла с тем же именем к новому не относятся
+            self.tombstones_file.unlink(missing_ok=True)
+            self._write_tree(ET.ElementTree(ET.Element("players")))
+
+    def _write_tree(self, tree) -> None:
+        with atomic_file(self.xml_file) as file:
+            # Явный </players> даже у пустого корня нужен для дописывания в конец
+            tree.write(
+                file,
+                encoding="utf-8",
+                xml_declaration=True,
+                short_empty_elements=False,
+            )
 
     def player_to_dict(self, player: Player) -> dict:
+        # NULL записывается пустым текстом, при чтении пустой текст - снова None
         return {
-            "id": str(player.id),
+            "id": str(player.id) if player.id is not None else "",
             "full_name": player.full_name,
             "birth_date": player.birth_date.isoformat(),
-            "football_team": player.football_team,
-            "home_city": player.home_city,
+            "football_team": player.football_team or "",
+            "home_city": player.home_city or "",
             "team_type": player.team_type.value if player.team_type else "",
             "position": player.position.value if player.position else "",
         }
 
-    def dict_to_player(self, data: Dict) -> Player:
-        return Player(
-            full_name=data.get("full_name"),
-            birth_date=datetime.strptime(data["birth_date"], "%Y-%m-%d").date(),
-            football_team=data.get("football_team"),
-            home_city=data.get("home_city"),
-            team_type=TeamType(data["team_type"]) if data.get("team_type") else None,
-            position=PlayerPosition(data["position"]) if data.get("position") else None,
-        )
+    def _player_element(self, player: Player):
+        player_elem = ET.Element("player")
+        for key, value in self.player_to_dict(player).items():
+            elem = ET.SubElement(player_elem, key)
+            elem.text = str(value)
+        return player_elem
 
     def add_data(self, player: Player) -> None:
+        self.add_many([player])
+
+    def add_many(self, players: Iterable[Player], chunk_size: int = 5000) -> int:
         self._ensure_file_exists()
+        cache = get_cache(self.xml_file)
+        if cache is not None:
+            players = cache.tracking(players)
+        try:
+            added = self._write_appended(players, chunk_size)
+        except BaseException:
+            drop_cache(self.xml_file)
+            raise
+        if cache is not None:
+            cache.remember_signature()
+        return added
+
+    def _write_appended(self, players, chunk_size: int) -> int:
+        with open(self.xml_file, "r+b") as file:
+            offset = self._find_append_offset(file)
+            if offset is not None:
+                return self._append_at(file, offset, players, chunk_size)
+        return self._rewrite_with(players)
+
+    def _find_append_offset(self, file) -> Optional[int]:
+        """Позиция закрывающего </players> или None, если дописать нельзя"""
+        header = file.read(100).lower()
+        if b"encoding=" in header and b"utf-8" not in header:
+            return None
+
+        self._restore_closing_tag(file)
+        size = file.seek(0, os.SEEK_END)
+        tail_start = max(0, size - self.TAIL_SCAN_SIZE)
+        file.seek(tail_start)
+        tail = file.read()
+        position = tail.rfind(self.CLOSING_TAG)
+        if position < 0 or tail[position + len(self.CLOSING_TAG) :].strip():
+            return None
+        return tail_start + position
+
+    def _append_at(self, file, offset: int, players, chunk_size: int) -> int:
+        # Новые записи пишутся поверх </players>, тег дописывается следом
+        added = 0
+        players = iter(players)
+        while chunk := list(islice(players, chunk_size)):
+            data = b"".join(
+                ET.tostring(self._player_element(player), encoding="utf-8")
+                for player in chunk
+            )
+            file.seek(offset)
+            file.write(data + self.CLOSING_TAG)
+            offset += len(data)
+            added += len(chunk)
+
+        if added:
+            file.truncate()
+            file.flush()
+            os.fsync(file.fileno())
+        return added
+
+    def _tail(self, file) -> bytes:
+        size = file.seek(0, os.SEEK_END)
+        file.seek(max(0, size - self.TAIL_SCAN_SIZE))
+        return file.read()
+
+    def _restore_closing_tag(self, file) -> None:
+        """Чинит файл после оборванной дозаписи.
+
+        Дозапись пишет поверх </players> и возвращает его последним. Если
+        процесс прервался раньше, файл обрезается до последнего целого
+        </player> и закрывающий тег дописывается заново.
+        """
+        if self.CLOSING_TAG in self._tail(file):
+            return
+        end = self._last_complete_player_end(file)
+        if end is None:
+            return
+        file.seek(end)
+        file.write(self.CLOSING_TAG)
+        file.truncate()
+        file.flush()
+        os.fsync(file.fileno())
+
+    def _last_complete_player_end(self, file) -> Optional[int]:
+        """Конец последнего целого </player> или открывающего <players>"""
+        size = file.seek(0, os.SEEK_END)
+        overlap = len(self.PLAYER_CLOSING_TAG) - 1
+        end = size
+        # Блоки читаются с конца и перекрываются, чтобы не разрезать тег
+        while end > 0:
+            start = max(0, end - self.TAIL_SCAN_SIZE)
+            file.seek(start)
+            block = file.read(end - start + overlap)
+            position = block.rfind(self.PLAYER_CLOSING_TAG)
+            if position >= 0:
+                return start + position + len(self.PLAYER_CLOSING_TAG)
+            end = start
+        file.seek(0)
+        position = file.read(self.TAIL_SCAN_SIZE).find(self.OPENING_TAG)
+        return None if position < 0 else position + len(self.OPENING_TAG)
+
+    def _repair(self):
+        """Восстанавливает закрывающий тег перед чтением, если он потерян"""
+        with open(self.xml_file, "rb") as file:
+            if self.CLOSING_TAG in self._tail(file):
+                return
+        with open(self.xml_file, "r+b") as file:
+            self._restore_closing_tag(file)
+
+    def _rewrite_with(self, players) -> int:
+        # Запасной путь для файлов, в конец которых дописать нельзя
+        self._repair()
         tree = ET.parse(self.xml_file)
         root = tree.getroot()
+        added = 0
+        for player in players:
+            root.append(self._player_element(player))
+            added += 1
+        self._write_tree(tree)
+        return added
 
-        player_elem = ET.SubElement(root, "player")
-        for key, value in self.player_to_dict(player).items():
-            elem = ET.SubElement(player_elem, key)
-            elem.text = str(value)
-
-        tree.write(self.xml_file, encoding="utf-8", xml_declaration=True)
+    def _iter_player_elements(self):
+        """Потоковый разбор файла: элементы <player> по одному.
 
-    def get_data(self) -> List[Player]:
+        Уже обработанные элементы удаляются из корня, поэтому память
+        не растёт вместе с размером файла.
+        """
         self._ensure_file_exists()
-        tree = ET.parse(self.xml_file)
-        return [
-            self.dict_to_player({child.tag: child.text for child in elem})
-            for elem in tree.findall("player")
-        ]
-
-    def search(self, **filters) -> List[Player]:
-        players = self.get_data()
-        return [p for p in players if self._matches_filters(p, filters)]
-
-    def _matches_filters(self, player: Player, filters: dict) -> bool:
-        for key, value in filters.items():
-            if value is None:
+        self._repair()
+        with open(self.xml_file, "rb") as source:
+            context = ET.iterparse(source, events=("start", "end"))
+            _, root = next(context)
+            for event, elem in context:
+                if event == "end" and elem.tag == "player":
+                    yield elem
+                    root.clear()
+
+    def iter_records(self, start_after: int = 0):
+        """Возвращает пары (номер записи, словарь текстовых полей).
+
+        Поле id заменяется номером записи, чтобы по нему можно было искать.
+        """
+        for row_id, elem in enumerate(self._iter_player_elements(), start=1):
+            if row_id > start_after:
+                data = {child.tag: child.text for child in elem}
+                data["id"] = row_id
+                yield row_id, data
+
+    def iter_players(self, player_query: PlayerQuery = None, start_after: int = 0):
+        # В XML идентификатором служит порядковый номер записи в файле
+        matches = player_query.record_predicate() if player_query else None
+        dead = self.tombstones()
+        for row_id, data in self.iter_records(start_after):
+            if row_id in dead:
                 continue
+            if matches is None or matches(data):
+                yield PlayerRow.from_record(row_id, data)
 
-            if key == "full_name_part":
-                if value.lower() not in player.full_name.lower():
-                    return False
-            elif key == "birth_date":
-                if player.birth_date != value:
-                    return False
-            elif key == "position_or_team_type":
-                if not (player.position == value or player.team_type == value):
-                    return False
-            elif key == "team_or_city":
-                if not (player.football_team == value or player.home_city == value):
-                    return False
-            else:
-                if str(getattr(player, key, "")).lower() != str(value).lower():
-                    return False
-        return True
-
-    def delete(self, **filters) -> int:
+    def _cache(self) -> Optional[XMLCache]:
+        """Актуальная копия файла в памяти или None для потокового чтения"""
+        if not self.use_cache:
+            return None
         self._ensure_file_exists()
-        tree = ET.parse(self.xml_file)
-        root = tree.getroot()
+        cache = get_cache(self.xml_file)
+        if cache is None:
+            if self.xml_file.stat().st_size > self.MAX_CACHED_FILE_SIZE:
+                return None
+            cache = XMLCache(self.xml_file)
+            signature = cache.stat_signature(self.xml_file)
+            cache.extend(self._iter_all_players())
+            cache.signature = signature
+            store_cache(cache)
+        tombstones_signature = self._tombstones_signature()
+        if cache.tombstone_signature != tombstones_signature:
+            # Номера за пределами файла ничего не помечают
+            dead = self.tombstones()
+            cache.deleted = {row_id - 1 for row_id in dead if row_id <= len(cache)}
+            cache.tombstone_signature = self._tombstones_signature()
+        return cache
+
+    def _iter_all_players(self):
+        # Копия в памяти хранит и помеченные строки, чтобы позиции совпадали с файлом
+        for row_id, data in self.iter_records():
+            yield PlayerRow.from_record(row_id, data)
 
-        to_keep = []
-        deleted_count = 0
+    def get_data(self) -> List[PlayerRow]:
+        cache = self._cache()
+        if cache is not None:
+            return [cache.player(row) for row in cache.matching_rows()]
+        return list(self.iter_players())
 
-        for player_elem in root.findall("player"):
-            player = self.dict_to_player(
-                {child.tag: child.text for child in player_elem}
+    def count(self, player_query: PlayerQuery = None) -> int:
+        cache = self._cache()
+        if cache is not None:
+            return len(cache.matching_rows(player_query))
+        if player_query:
+            return sum(1 for _ in self.iter_players(player_query))
+        total = sum(1 for _ in self._iter_player_elements())
+        return total - sum(1 for row_id in self.tombstones() if row_id <= total)
+
+    def get_page(
+        self, offset: int, limit: int, player_query: PlayerQuery = None
+    ) -> List[PlayerRow]:
+        cache = self._cache()
+        if cache is not None:
+            rows = cache.matching_rows(player_query)[offset : offset + limit]
+            return [cache.player(row) for row in rows]
+        if player_query or self.tombstones():
+            players = self.iter_players(player_query)
+            return list(islice(players, offset, offset + limit))
+        # Без фильтров пропущенные записи не превращаются в Player
+        return list(islice(self.iter_players(start_after=offset), limit))
+
+    def seek_page(
+        self,
+        limit: int,
+        after_id: Optional[int] = None,
+        before_id: Optional[int] = None,
+        from_end: bool = False,
+        player_query: PlayerQuery = None,
+    ) -> List[PlayerRow]:
+        cache = self._cache()
+        if cache is not None:
+            rows = seek_positions(
+                cache.matching_rows(player_query), limit, after_id, before_id, from_end
             )
+            return [cache.player(row) for row in rows]
+
+        if after_id is not None:
+            return list(islice(self.iter_players(player_query, after_id), limit))
+        players = self.iter_players(player_query)
+        if before_id is not None:
+            earlier = takewhile(lambda p: p.id < before_id, players)
+            return list(deque(earlier, maxlen=limit))
+        if from_end:
+            return list(deque(players, maxlen=limit))
+        return list(islice(players, limit))
 
-            if self._matches_filters(player, filters):
-                deleted_count += 1
-            else:
-                to_keep.append(player_elem)
+    def signature(self) -> tuple:
+        """mtime и размер файла и файла пометок: меняются при любой записи"""
+        self._ensure_file_exists()
+        return XMLCache.stat_signature(self.xml_file), self._tombstones_signature()
+
+    def get_by_ids(self, ids: List[int]) -> List[PlayerRow]:
+        cache = self._cache()
+        if cache is not None:
+            return [
+                cache.player(row_id - 1)
+                for row_id in ids
+                if row_id <= len(cache) and row_id - 1 not in cache.deleted
+            ]
+        wanted = set(ids)
+        return [player for player in self.iter_players() if player.id in wanted]
+
+    def group_counts(self, columns: Iterable[str]) -> Dict[str, Dict]:
+        """Количество записей по значениям каждой колонки"""
+        columns = list(columns)
+        cache = self._cache()
+        if cache is not None:
+            # Размеры списков в индексах копии - готовые группировки
+            result = {}
+            for column in columns:
+                counts = {
+                    value: len(rows) for value, rows in cache.indexes[column].items()
+                }
+                # Помеченные удалёнными вычитаются, их обычно немного
+                values = cache.columns[column]
+                for row in cache.deleted:
+                    value = values[row]
+                    if value is not None:
+                        counts[value] -= 1
+                counts = {value: count for value, count in counts.items() if count}
+                missing = cache.live_count() - sum(counts.values())
+                if missing:
+                    counts[None] = missing
+                result[column] = counts
+            return result
+
+        counters = {column: Counter() for column in columns}
+        for player in self.iter_players():
+            for column in columns:
+                counters[column][getattr(player, column)] += 1
+        return {column: dict(counter) for column, counter in counters.items()}
+
+    def search(self, player_query: PlayerQuery = None) -> List[PlayerRow]:
+        cache = self._cache()
+        if cache is not None:
+            players = [cache.player(row) for row in cache.matching_rows(player_query)]
+        else:
+            players = list(self.iter_players(player_query))
+        return player_query.arrange(players) if player_query is not None else players
+
+    def delete(self, player_query: PlayerQuery) -> int:
+        """Физическое удаление; заодно очищаются помеченные удалёнными записи"""
+        if player_query.limit is not None or player_query.offset:
+            # Ограничения зависят от порядка, поэтому номера находятся поиском
+            ids = {player.id for player in self.search(player_query)}
+            matches = lambda record: record["id"] in ids
+        else:
+            matches = player_query.record_predicate()
+        deleted, _ = self._rewrite_without(matches)
+        return deleted
+
+    def mark_deleted(self, player_query: PlayerQuery) -> int:
+        """Мягкое удаление: номера найденных записей дописываются в файл пометок.
+
+        Сам XML не переписывается, поэтому цена - O(найденных).
+        """
+        ids = [player.id for player in self.search(player_query)]
+        if not ids:
+            return 0
+        with open(self.tombstones_file, "a", encoding="utf-8") as file:
+            if file.tell() == 0:
+                # Размер XML, к которому относятся пометки
+                file.write(f"#{self.xml_file.stat().st_size}\n")
+            file.write("".join(f"{row_id}\n" for row_id in ids))
+            file.flush()
+            os.fsync(file.fileno())
+
+        cache = get_cache(self.xml_file)
+        if cache is not None:
+            cache.deleted.update(row_id - 1 for row_id in ids)
+            cache.tombstone_signature = self._tombstones_signature()
+        return len(ids)
+
+    def compact(self) -> int:
+        """Переписывает файл без помеченных удалёнными записей; номера сдвигаются"""
+        if not self.tombstones_file.exists():
+            return 0
+        _, purged = self._rewrite_without(lambda record: False)
+        return purged
+
+    def _rewrite_without(self, matches) -> tuple:
+        """Один последовательный проход: оставшиеся записи сразу пишутся во
+        временный файл, который затем атомарно заменяет исходный.
+
+        Возвращает (удалено подходящих под matches, очищено помеченных).
+        """
+        self._ensure_file_exists()
+        cache = get_cache(self.xml_file)
+        dead = self.tombstones()
+        removed_rows = []
+        deleted = 0
 
-        new_root = ET.Element("players")
-        for elem in to_keep:
-            new_root.append(elem)
+        with atomic_file(self.xml_file) as file:
+            file.write(b"<?xml version='1.0' encoding='utf-8'?>\n<players>")
+            for position, elem in enumerate(self._iter_player_elements()):
+                data = {child.tag: child.text for child in elem}
+                data["id"] = position + 1
+                if data["id"] in dead:
+                    removed_rows.append(position)
+                elif matches(data):
+                    removed_rows.append(position)
+                    deleted += 1
+                else:
+                    file.write(ET.tostring(elem, encoding="utf-8"))
+            file.write(self.CLOSING_TAG)
 
-        ET.ElementTree(new_root).write(
-            self.xml_file, encoding="utf-8", xml_declaration=True
-        )
-        return deleted_count
+        # Номера записей изменились, старые пометки больше не действительны
+        self.tombstones_file.unlink(missing_ok=True)
+        if cache is not None:
+            cache.remove(removed_rows)
+            cache.remember_signature()
+            cache.tombstone_signature = None
+        return deleted, len(removed_rows) - deleted
@@ -0,0 +1,167 @@
+import os
+from bisect import bisect_left
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+from models.database import Player
+from models.rows import PlayerRow, TEAM_TYPE_CODES, POSITION_CODES
+
+
+class XMLCache:
+    """Разобранная копия XML файла в памяти: колонки и вторичные индексы.
+
+    Строки адресуются позицией в файле (с нуля). Копия действительна, пока
+    mtime и размер файла совпадают с запомненными при загрузке.
+    """
+
+    COLUMNS = (
+        "full_name",
+        "birth_date",
+        "football_team",
+        "home_city",
+        "team_type",
+        "position",
+    )
+    # Индексируемые колонки: значение -> возрастающий список позиций
+    INDEXED = ("birth_date", "football_team", "home_city", "team_type", "position")
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.signature = None
+        self.columns = {name: [] for name in self.COLUMNS}
+        self.full_name_cf = []
+        self.indexes = {name: defaultdict(list) for name in self.INDEXED}
+        # Позиции строк, помеченных удалёнными, и подпись файла пометок
+        self.deleted = set()
+        self.tombstone_signature = None
+
+    def __len__(self):
+        return len(self.full_name_cf)
+
+    @staticmethod
+    def stat_signature(path: Path):
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def is_fresh(self) -> bool:
+        try:
+            return self.signature == self.stat_signature(self.path)
+        except FileNotFoundError:
+            return False
+
+    def remember_signature(self):
+        self.signature = self.stat_signature(self.path)
+
+    def append(self, player: Player):
+        position = len(self)
+        for name in self.COLUMNS:
+            self.columns[name].append(getattr(player, name))
+        self.full_name_cf.append((player.full_name or "").casefold())
+        for name in self.INDEXED:
+            value = getattr(player, name)
+            if value is not None:
+                self.indexes[name][value].append(position)
+
+    def extend(self, players: Iterable[Player]):
+        for player in players:
+            self.append(player)
+
+    def tracking(self, players: Iterable[Player]):
+        """Пропускает игроков дальше, параллельно добавляя их в копию"""
+        for player in players:
+            self.append(player)
+            yield player
+
+    def remove(self, positions: List[int]):
+        """Удаляет строки и сдвигает позиции в индексах без повторного разбора"""
+        if not positions:
+            return
+        deleted = sorted(positions)
+        deleted_set = set(deleted)
+
+        for name in self.COLUMNS:
+            column = self.columns[name]
+            self.columns[name] = [
+                value for i, value in enumerate(column) if i not in deleted_set
+            ]
+        self.full_name_cf = [
+            value for i, value in enumerate(self.full_name_cf) if i not in deleted_set
+        ]
+
+        for name in self.INDEXED:
+            index = self.indexes[name]
+            for key in list(index):
+                rows = [
+                    row - bisect_left(deleted, row)
+                    for row in index[key]
+                    if row not in deleted_set
+                ]
+                if rows:
+                    index[key] = rows
+                else:
+                    del index[key]
+
+        self.deleted = {
+            row - bisect_left(deleted, row)
+            for row in self.deleted
+            if row not in deleted_set
+        }
+
+    def player(self, position: int) -> PlayerRow:
+        columns = self.columns
+        team_type = columns["team_type"][position]
+        player_position = columns["position"][position]
+        return PlayerRow(
+            position + 1,
+            columns["full_name"][position],
+            columns["birth_date"][position],
+            columns["football_team"][position],
+            columns["home_city"][position],
+            None if team_type is None else TEAM_TYPE_CODES[team_type],
+            None if player_position is None else POSITION_CODES[player_position],
+            self.full_name_cf[position],
+        )
+
+    def lookup(self, column: str, value) -> List[int]:
+        return self.indexes[column].get(value, [])
+
+    def index_rows(self, column: str, test) -> set:
+        """Позиции строк, у которых значение индексированной колонки проходит test.
+
+        Различных значений немного, поэтому перебираются ключи индекса.
+        """
+        rows = set()
+        for value, positions in self.indexes[column].items():
+            if test(value):
+                rows.update(positions)
+        return rows
+
+    def matching_rows(self, player_query=None) -> List[int]:
+        """Возрастающие позиции живых строк, подходящих под PlayerQuery или PlayerFilter"""
+        if player_query is None or player_query.is_empty():
+            if not self.deleted:
+                return list(range(len(self)))
+            return [row for row in range(len(self)) if row not in self.deleted]
+        return sorted(player_query.cache_rows(self) - self.deleted)
+
+    def live_count(self) -> int:
+        return len(self) - len(self.deleted)
+
+
+# Копии разделяются между экземплярами XMLAdapter для одного файла
+_caches: Dict[Path, XMLCache] = {}
+
+
+def get_cache(path: Path) -> Optional[XMLCache]:
+    cache = _caches.get(path.resolve())
+    if cache is not None and cache.is_fresh():
+        return cache
+    return None
+
+
+def store_cache(cache: XMLCache):
+    _caches[cache.path.resolve()] = cache
+
+
+def drop_cache(path: Path):
+    _caches.pop(path.resolve(), None)
@@ -0,0 +1,60 @@
+from datetime import date
+from models.database import Player, TeamType, PlayerPosition
+from models.query import Field, PlayerQuery
+from models.xml_adapter import XMLAdapter
+
+
+def _player(**values):
+    fields = {
+        "full_name": "Иванов Иван Иванович",
+        "birth_date": date(1990, 5, 17),
+        "football_team": None,
+        "home_city": None,
+        "team_type": None,
+        "position": None,
+    }
+    fields.update(values)
+    return Player(**fields)
+
+
+def test_null_fields_round_trip(tmp_path):
+    xml_file = tmp_path / "players.xml"
+    XMLAdapter(str(xml_file)).add_many(
+        [
+            _player(),
+            _player(
+                football_team="Зенит",
+                home_city="Москва",
+                team_type=TeamType.MAIN,
+                position=PlayerPosition.GOALKEEPER,
+            ),
+        ]
+    )
+
+    assert b"None" not in xml_file.read_bytes()
+    # Копия в памяти и потоковое чтение разбирают запись одинаково
+    for use_cache in (True, False):
+        empty, filled = XMLAdapter(str(xml_file), use_cache=use_cache).get_data()
+        assert empty.football_team is None
+        assert empty.home_city is None
+        assert empty.team_type is None
+        assert empty.position is None
+        assert filled.football_team == "Зенит"
+        assert filled.home_city == "Москва"
+        assert filled.team_type == TeamType.MAIN
+        assert filled.position == PlayerPosition.GOALKEEPER
+
+
+def test_tombstones_do_not_outlive_their_file(tmp_path):
+    xml_file = tmp_path / "players.xml"
+    adapter = XMLAdapter(str(xml_file))
+    adapter.add_many([_player(full_name=f"Игрок {n}") for n in range(3)])
+    assert adapter.mark_deleted(PlayerQuery(Field("id") == 2)) == 1
+    assert adapter.count() == 2
+
+    # Новый файл с тем же именем не наследует пометки старого
+    xml_file.unlink()
+    adapter.add_many([_player(full_name=f"Новый {n}") for n in range(3)])
+    assert adapter.tombstones() == set()
+    assert adapter.count() == 3
+    assert not adapter.tombstones_file.exists()
@@ -51,10 +51,10 @@ class DeleteWindow:
 
         def delete():
             birth_date = date_entry.get_date() if date_entry.get() else None
-            self.controller.delete_by_name_birth(
-                name_part=name_entry.get(), birth_date=birth_date
+            self.confirm(
+                input_window,
+                self.controller.name_birth_criteria(name_entry.get(), birth_date),
             )
-            input_window.destroy()
 
         ttk.Button(input_window, text="Удалить", command=delete).pack(pady=10)
         ttk.Button(input_window, text="Закрыть", command=input_window.destroy).pack()
@@ -79,10 +79,12 @@ class DeleteWindow:
         team_type_combo.pack()
 
         def delete():
-            self.controller.delete_by_position_team_type(
-                position=position_combo.get(), team_type=team_type_combo.get()
+            self.confirm(
+                input_window,
+                self.controller.position_team_type_criteria(
+                    position_combo.get(), team_type_combo.get()
+                ),
             )
-            input_window.destroy()
 
         ttk.Button(input_window, text="Удалить", command=delete).pack(pady=10)
         ttk.Button(input_window, text="Закрыть", command=input_window.destroy).pack()
@@ -101,10 +103,64 @@ class DeleteWindow:
         city_entry.pack()
 
         def delete():
-            self.controller.delete_by_team_city(
-                team=team_entry.get(), city=city_entry.get()
+            self.confirm(
+                input_window,
+                self.controller.team_city_criteria(team_entry.get(), city_entry.get()),
             )
-            input_window.destroy()
 
         ttk.Button(input_window, text="Удалить", command=delete).pack(pady=10)
         ttk.Button(input_window, text="Закрыть", command=input_window.destroy).pack()
+
+    def confirm(self, input_window, criteria):
+        """Сначала быстрый подсчёт и примеры, удаление - только после подтверждения"""
+        self.controller.preview_deletion(
+            criteria, lambda preview: self.show_preview(input_window, criteria, preview)
+        )
+
+    def show_preview(self, input_window, criteria, preview):
+        if not input_window.winfo_exists():
+            return
+        if preview.total == 0:
+            self.gui.open_deleted_count_window("Игроки не найдены")
+            return
+        input_window.destroy()
+
+        window = tk.Toplevel(self.window)
+        window.title("Подтверждение удаления")
+        window.geometry("450x350")
+
+        ttk.Label(window, text=f"Будет удалено игроков: {preview.total}").pack(pady=5)
+        sample_list = tk.Listbox(window, height=10)
+        for player in preview.sample:
+            sample_list.insert(
+                "end",
+                f"{player.full_name}, {player.birth_date}, {player.football_team}",
+            )
+        if preview.total > len(preview.sample):
+            sample_list.insert(
+                "end", f"... и ещё {preview.total - len(preview.sample)}"
+            )
+        sample_list.pack(fill="x", padx=10)
+
+        progress_bar = ttk.Progressbar(window, maximum=1.0, mode="determinate")
+        progress_bar.pack(fill="x", padx=10, pady=5)
+        status_label = ttk.Label(window, text="")
+        status_label.pack()
+
+        def show_progress(step):
+            if not window.winfo_exists():
+                return
+            progress_bar["value"] = step.fraction
+            status_label.config(text=f"Удалено {step.deleted} из {preview.total}")
+            if step.fraction >= 1:
+                window.destroy()
+
+        def delete():
+            delete_button.config(state="disabled")
+            cancel_button.config(state="disabled")
+            self.controller.delete_players(criteria, on_progress=show_progress)
+
+        delete_button = ttk.Button(window, text="Удалить", command=delete)
+        delete_button.pack(pady=5)
+        cancel_button = ttk.Button(window, text="Отмена", command=window.destroy)
+        cancel_button.pack()
@@ -0,0 +1,110 @@
+import tkinter as tk
+from tkinter import ttk, filedialog
+
+
+class DiagnosticsWindow:
+    """Статистика SQL запросов и кэша результатов поиска"""
+
+    COLUMNS = {
+        "count": ("Вызовов", 70),
+        "avg_ms": ("Среднее, мс", 90),
+        "p95_ms": ("p95, мс", 80),
+        "max_ms": ("Макс, мс", 80),
+        "total_ms": ("Всего, мс", 90),
+        "changed_rows": ("Изменено строк", 100),
+        "statement": ("Запрос", 600),
+    }
+
+    def __init__(self, gui):
+        self.gui = gui
+        self.controller = gui.controller
+
+    def show(self):
+        self.window = tk.Toplevel(self.gui.root)
+        self.window.title("Диагностика")
+        self.window.geometry("1200x600")
+
+        top = tk.Frame(self.window)
+        top.pack(side="top", fill="x", padx=10, pady=5)
+
+        self.enabled_var = tk.BooleanVar(
+            value=self.controller.diagnostics_report()["enabled"]
+        )
+        ttk.Checkbutton(
+            top,
+            text="Сбор статистики запросов",
+            variable=self.enabled_var,
+            command=self.toggle,
+        ).pack(side="left")
+        ttk.Button(top, text="Обновить", command=self.refresh).pack(side="left", padx=5)
+        ttk.Button(top, text="Сбросить", command=self.reset).pack(side="left", padx=5)
+        ttk.Button(top, text="Сохранить JSON", command=self.save).pack(
+            side="left", padx=5
+        )
+
+        self.cache_label = tk.Label(self.window, text="", anchor="w")
+        self.cache_label.pack(side="top", fill="x", padx=10)
+
+        self.tree = ttk.Treeview(
+            self.window, columns=tuple(self.COLUMNS), show="headings"
+        )
+        for column, (title, width) in self.COLUMNS.items():
+            self.tree.heading(column, text=title)
+            self.tree.column(column, width=width, anchor="w")
+        self.tree.pack(expand=True, fill="both", padx=10, pady=5)
+
+        tk.Label(self.window, text="Медленные запросы:", anchor="w").pack(
+            fill="x", padx=10
+        )
+        self.slow_list = tk.Listbox(self.window, height=8)
+        self.slow_list.pack(fill="x", padx=10, pady=5)
+
+        self.refresh()
+
+    def toggle(self):
+        self.controller.set_instrumentation(self.enabled_var.get())
+        self.refresh()
+
+    def reset(self):
+        self.controller.reset_diagnostics()
+        self.refresh()
+
+    def save(self):
+        path = filedialog.asksaveasfilename(
+            parent=self.window,
+            defaultextension=".json",
+            filetypes=[("JSON файлы", "*.json")],
+        )
+        if path:
+            self.controller.dump_diagnostics(path)
+
+    def refresh(self):
+        report = self.controller.diagnostics_report()
+        cache = report["query_cache"]
+        self.cache_label.config(
+            text=(
+                f"Кэш поиска: {cache['entries']}/{cache['max_entries']} записей, "
+                f"попаданий {cache['hits']}, промахов {cache['misses']}, "
+                f"вытеснено {cache['evictions']}, доля попаданий "
+                f"{cache['hit_rate']:.0%}"
+            )
+        )
+
+        self.tree.delete(*self.tree.get_children())
+        for statement in report["statements"]:
+            self.tree.insert(
+                "",
+                "end",
+                # У запросов, не меняющих строк, колонка пустая
+                values=tuple(
+                    "" if statement[column] is None else statement[column]
+                    for column in self.COLUMNS
+                ),
+            )
+
+        self.slow_list.delete(0, "end")
+        for sample in reversed(report["slow_samples"]):
+            self.slow_list.insert(
+                "end",
+                f"{sample['at']}  {sample['elapsed_ms']} мс  {sample['statement']}",
+            )
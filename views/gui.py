@@ -1,9 +1,13 @@
 import tkinter as tk
 from tkinter import ttk, filedialog
 from controllers.controller import Controller
+from controllers.worker import BackgroundWorker
 from views.add import AddWindow
 from views.delete import DeleteWindow
+from views.diagnostics import DiagnosticsWindow
 from views.search import SearchWindow
+from views.stats import StatsWindow
+from views.virtual_table import VirtualTable, PLAYER_COLUMNS, player_values
 
 
 class GUI:
@@ -13,7 +17,9 @@ class GUI:
         self.root.geometry("1920x1080")
         self.view_mode = "table"
         self.create_widgets()
-        self.controller = Controller(self)
+        self.worker = BackgroundWorker(self.root, on_busy=self.set_busy)
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
+        self.controller = Controller(self, self.worker)
         self.setup_pagination()
         self.controller.load_data()
 
@@ -26,15 +32,21 @@ class GUI:
         buttons = [
             ("Добавить игрока", self.open_add_window),
             ("Поиск игроков", self.open_search_window),
+            ("Статистика", self.open_stats_window),
             ("Удалить игроков", self.open_delete_window),
             ("Источник данных", self.open_change_data_source_window),
             ("Вид отображения", self.toggle_view_mode),
+            ("Диагностика", self.open_diagnostics_window),
         ]
 
         for i, (text, cmd) in enumerate(buttons):
             btn = tk.Button(self.button_frame, text=text, command=cmd)
             btn.grid(row=0, column=i, padx=5, pady=5)
 
+        # Индикатор выполнения фоновых запросов
+        self.busy_label = tk.Label(self.button_frame, text="", fg="gray")
+        self.busy_label.grid(row=0, column=len(buttons), padx=10)
+
         self.data_container = tk.Frame(self.root)
         self.data_container.pack(expand=True, fill="both")
 
@@ -43,37 +55,14 @@ class GUI:
 
     def setup_table(self):
         """Настройка табличного представления"""
-        self.tree = ttk.Treeview(
-            self.data_container,
-            columns=(
-                "ФИО игрока",
-                "Дата рождения",
-                "Команда",
-                "Город",
-                "Состав",
-                "Позиция",
-            ),
-            show="headings",
-        )
-
-        columns_config = {
-            "ФИО игрока": 250,
-            "Дата рождения": 120,
-            "Команда": 150,
-            "Город": 120,
-            "Состав": 100,
-            "Позиция": 120,
-        }
-
-        for col, width in columns_config.items():
-            self.tree.heading(col, text=col)
-            self.tree.column(col, width=width, anchor="center")
-
-        self.tree.pack(expand=True, fill="both")
+        self.table = VirtualTable(self.data_container, PLAYER_COLUMNS)
+        self.table.pack(expand=True, fill="both")
 
     def setup_treeview(self):
         """Настройка древовидного представления"""
         self.treeview = ttk.Treeview(self.data_container, show="tree")
+        self.treeview.bind("<<TreeviewOpen>>", self.on_tree_open)
+        self.tree_players = {}
         self.treeview.pack_forget()
 
     def setup_pagination(self):
@@ -138,6 +127,14 @@ class GUI:
 
         self.records_var.set(str(self.controller.records_per_page))
 
+    def set_busy(self, busy: bool):
+        self.busy_label.config(text="Загрузка..." if busy else "")
+        self.root.config(cursor="watch" if busy else "")
+
+    def close(self):
+        self.worker.close()
+        self.root.destroy()
+
     def validate_int(self, value):
         """Валидация целочисленного ввода"""
         return value.isdigit() or value == ""
@@ -153,43 +150,78 @@ class GUI:
 
     def update_table(self, players, current_page, total_pages, total_records):
         """Обновление данных в таблице"""
-        for widget in [self.tree, self.treeview]:
-            for item in widget.get_children():
-                widget.delete(item)
+        if self.view_mode == "table":
+            self.clear_tree()
+            self.table.set_rows([player_values(player) for player in players])
+        else:
+            self.table.set_rows([])
+            self.fill_tree(players)
+
+        self.update_pagination_controls(current_page, total_pages, total_records)
 
+    def apply_page_diff(self, diff, players, current_page, total_pages, total_records):
+        """Точечное обновление текущей страницы после добавления или удаления"""
         if self.view_mode == "table":
-            for player in players:
-                self.tree.insert(
-                    "",
-                    "end",
-                    values=(
-                        player.full_name,
-                        player.birth_date.strftime("%d.%m.%Y"),
-                        player.football_team,
-                        player.home_city,
-                        player.team_type.value,
-                        player.position.value,
-                    ),
-                )
+            self.table.replace_rows([player_values(player) for player in players])
         else:
-            for player in players:
-                player_node = self.treeview.insert(
-                    "",
-                    "end",
-                    text=f"{player.full_name} ({player.birth_date})",
-                    open=True,
+            for player_id in diff.removed:
+                self.treeview.delete(str(player_id))
+                self.tree_players.pop(str(player_id), None)
+            for player in diff.updated:
+                player_node = str(player.id)
+                self.treeview.delete(*self.treeview.get_children(player_node))
+                self.treeview.item(
+                    player_node, text=self.player_title(player), open=False
                 )
-                fields = [
-                    ("Команда", player.football_team),
-                    ("Город", player.home_city),
-                    ("Состав", player.team_type.value),
-                    ("Позиция", player.position.value),
-                ]
-                for field, value in fields:
-                    self.treeview.insert(player_node, "end", text=f"{field}: {value}")
+                self.treeview.insert(player_node, "end")
+                self.tree_players[player_node] = player
+            for index, player in diff.inserted:
+                self.insert_player_node(player, index)
+            for index, player_id in enumerate(diff.order):
+                if self.treeview.index(str(player_id)) != index:
+                    self.treeview.move(str(player_id), "", index)
 
         self.update_pagination_controls(current_page, total_pages, total_records)
 
+    def clear_tree(self):
+        self.treeview.delete(*self.treeview.get_children())
+        self.tree_players = {}
+
+    @staticmethod
+    def player_title(player):
+        return f"{player.full_name} ({player.birth_date})"
+
+    def fill_tree(self, players):
+        """Узлы игроков без дочерних полей: они создаются при раскрытии"""
+        self.clear_tree()
+        for player in players:
+            self.insert_player_node(player, "end")
+
+    def insert_player_node(self, player, index):
+        # Идентификатор узла - id игрока, чтобы сопоставлять узлы между страницами
+        player_node = self.treeview.insert(
+            "", index, iid=str(player.id), text=self.player_title(player)
+        )
+        # Пустой дочерний узел нужен, чтобы у игрока был значок раскрытия
+        self.treeview.insert(player_node, "end")
+        self.tree_players[player_node] = player
+
+    def on_tree_open(self, event=None):
+        player_node = self.treeview.focus()
+        player = self.tree_players.pop(player_node, None)
+        if player is None:
+            return
+
+        self.treeview.delete(*self.treeview.get_children(player_node))
+        fields = [
+            ("Команда", player.football_team),
+            ("Город", player.home_city),
+            ("Состав", player.team_type.value),
+            ("Позиция", player.position.value),
+        ]
+        for field, value in fields:
+            self.treeview.insert(player_node, "end", text=f"{field}: {value}")
+
     def update_pagination_controls(self, current_page, total_pages, total_records):
         """Обновление элементов управления пагинацией"""
         self.page_label.config(text=f"{current_page}/{total_pages}")
@@ -219,12 +251,12 @@ class GUI:
     def change_to_table(self):
         self.view_mode = "table"
         self.treeview.pack_forget()
-        self.tree.pack(expand=True, fill="both")
+        self.table.pack(expand=True, fill="both")
         self.controller.update_view()
 
     def change_to_tree(self):
         self.view_mode = "tree"
-        self.tree.pack_forget()
+        self.table.pack_forget()
         self.treeview.pack(expand=True, fill="both")
         self.controller.update_view()
 
@@ -242,10 +274,17 @@ class GUI:
         ttk.Label(window, text=message).pack(pady=10)
         ttk.Button(window, text="OK", command=window.destroy).pack()
 
+    def open_info_window(self, message):
+        window = tk.Toplevel(self.root)
+        window.title("Готово")
+        window.geometry("400x150")
+        ttk.Label(window, text=message).pack(pady=10)
+        ttk.Button(window, text="OK", command=window.destroy).pack()
+
     def open_change_data_source_window(self):
         window = tk.Toplevel(self.root)
         window.title("Источник данных")
-        window.geometry("300x200")
+        window.geometry("300x330")
         ttk.Button(
             window,
             text="База данных",
@@ -259,6 +298,17 @@ class GUI:
         ttk.Button(
             window, text="Выбрать XML файл...", command=self.open_xml_file_dialog
         ).pack(pady=5)
+        ttk.Button(
+            window,
+            text="Двоичный файл (по умолчанию)",
+            command=lambda: self.controller.change_data_source("bin"),
+        ).pack(pady=5)
+        ttk.Button(
+            window, text="Выбрать двоичный файл...", command=self.open_bin_file_dialog
+        ).pack(pady=5)
+        ttk.Button(
+            window, text="Экспорт данных...", command=self.open_export_window
+        ).pack(pady=5)
         ttk.Button(window, text="Закрыть", command=window.destroy).pack(pady=5)
 
     def open_xml_file_dialog(self):
@@ -266,6 +316,45 @@ class GUI:
         if file_path:
             self.controller.change_xml_file(file_path)
 
+    def open_bin_file_dialog(self):
+        file_path = filedialog.askopenfilename(
+            filetypes=[("Двоичные файлы игроков", "*.bin")]
+        )
+        if file_path:
+            self.controller.change_bin_file(file_path)
+
+    def open_export_window(self):
+        """Копирование игроков текущего источника в базу данных или файл"""
+        window = tk.Toplevel(self.root)
+        window.title("Экспорт данных")
+        window.geometry("300x170")
+        ttk.Button(
+            window,
+            text="В базу данных",
+            command=lambda: self.controller.export_data("db"),
+        ).pack(pady=5)
+        ttk.Button(
+            window,
+            text="В XML файл...",
+            command=lambda: self.export_to_file(window, "xml", ".xml"),
+        ).pack(pady=5)
+        ttk.Button(
+            window,
+            text="В двоичный файл...",
+            command=lambda: self.export_to_file(window, "bin", ".bin"),
+        ).pack(pady=5)
+        ttk.Button(window, text="Закрыть", command=window.destroy).pack(pady=5)
+
+    def export_to_file(self, window, target: str, extension: str):
+        file_path = filedialog.asksaveasfilename(
+            parent=window,
+            defaultextension=extension,
+            filetypes=[(f"{extension} файлы", f"*{extension}")],
+            confirmoverwrite=False,
+        )
+        if file_path:
+            self.controller.export_data(target, file_path)
+
     def open_add_window(self):
         AddWindow(self).show()
 
@@ -274,3 +363,9 @@ class GUI:
 
     def open_search_window(self):
         SearchWindow(self).show()
+
+    def open_stats_window(self):
+        StatsWindow(self).show()
+
+    def open_diagnostics_window(self):
+        DiagnosticsWindow(self).show()
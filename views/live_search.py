@@ -0,0 +1,83 @@
+import tkinter as tk
+from tkinter import ttk
+from controllers.live_search import LiveSearchController
+from views.virtual_table import VirtualTable, PLAYER_COLUMNS, player_values
+
+
+class LiveSearchWindow:
+    """Поиск по ФИО, команде и городу по мере ввода в одном окне"""
+
+    # Пауза в наборе, после которой уходит запрос к хранилищу
+    DEBOUNCE_MS = 250
+
+    def __init__(self, gui):
+        self.gui = gui
+        self.live_search = LiveSearchController(gui.controller)
+        self.pending = None
+
+    def show(self):
+        self.window = tk.Toplevel(self.gui.root)
+        self.window.title("Поиск по мере ввода")
+        self.window.geometry("1200x600")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
+        fields_frame = tk.Frame(self.window)
+        fields_frame.pack(side="top", fill="x", padx=10, pady=10)
+
+        self.name_var = tk.StringVar()
+        self.team_var = tk.StringVar()
+        self.city_var = tk.StringVar()
+        fields = [
+            ("Часть ФИО:", self.name_var),
+            ("Команда:", self.team_var),
+            ("Город:", self.city_var),
+        ]
+        for column, (text, variable) in enumerate(fields):
+            ttk.Label(fields_frame, text=text).grid(row=0, column=2 * column, padx=5)
+            ttk.Entry(fields_frame, textvariable=variable).grid(
+                row=0, column=2 * column + 1, padx=5
+            )
+            variable.trace_add("write", lambda *args: self.on_change())
+
+        self.status_label = tk.Label(fields_frame, text="")
+        self.status_label.grid(row=0, column=2 * len(fields), padx=10)
+
+        self.table = VirtualTable(self.window, PLAYER_COLUMNS)
+        self.table.pack(expand=True, fill="both")
+
+    def on_change(self):
+        self.cancel_pending()
+        player_filter = self.live_search.player_filter(
+            name_part=self.name_var.get(),
+            team=self.team_var.get(),
+            city=self.city_var.get(),
+        )
+        if player_filter.is_empty():
+            self.show_results([])
+            return
+
+        players = self.live_search.cached(player_filter)
+        if players is not None:
+            self.show_results(players)
+            return
+
+        self.status_label.config(text="Поиск...")
+        self.pending = self.window.after(
+            self.DEBOUNCE_MS,
+            lambda: self.live_search.search(player_filter, self.show_results),
+        )
+
+    def cancel_pending(self):
+        if self.pending is not None:
+            self.window.after_cancel(self.pending)
+            self.pending = None
+        self.live_search.cancel()
+
+    def show_results(self, players):
+        self.pending = None
+        self.table.set_rows([player_values(player) for player in players])
+        self.status_label.config(text=f"Найдено: {len(players)}")
+
+    def close(self):
+        self.cancel_pending()
+        self.window.destroy()
@@ -3,6 +3,7 @@ from tkinter import ttk
 from tkcalendar import DateEntry
 from datetime import datetime
 from controllers.search_controller import SearchResultsController
+from views.live_search import LiveSearchWindow
 from views.search_results import SearchResultsView
 
 
@@ -14,7 +15,7 @@ class SearchWindow:
     def show(self):
         self.window = tk.Toplevel(self.gui.root)
         self.window.title("Поиск футболистов")
-        self.window.geometry("400x250")
+        self.window.geometry("400x290")
 
         ttk.Button(
             self.window,
@@ -31,16 +32,24 @@ class SearchWindow:
             text="Поиск по команде или городу",
             command=self.search_by_team_city,
         ).pack(pady=5)
+        ttk.Button(
+            self.window,
+            text="Поиск по мере ввода",
+            command=self.open_live_search,
+        ).pack(pady=5)
         ttk.Button(self.window, text="Закрыть", command=self.window.destroy).pack(
             pady=15
         )
 
-    def create_results_window(self, results):
+    def open_live_search(self):
+        LiveSearchWindow(self.gui).show()
+
+    def create_results_window(self, criteria):
         results_window = tk.Toplevel(self.window)
         results_window.title("Результаты поиска")
         results_window.geometry("1200x600")
 
-        search_controller = SearchResultsController(results)
+        search_controller = SearchResultsController(criteria, self.controller)
         search_view = SearchResultsView(results_window, search_controller)
         search_controller.view = search_view
         search_controller.update_view()
@@ -62,11 +71,11 @@ class SearchWindow:
 
         def search():
             birth_date = date_entry.get_date() if date_entry.get() else None
-            results = self.controller.search_by_name_birth(
+            criteria = self.controller.name_birth_criteria(
                 name_part=name_entry.get(), birth_date=birth_date
             )
             input_window.destroy()
-            self.create_results_window(results)
+            self.create_results_window(criteria)
 
         ttk.Button(input_window, text="Найти", command=search).pack(pady=5)
         ttk.Button(input_window, text="Закрыть", command=input_window.destroy).pack()
@@ -91,11 +100,11 @@ class SearchWindow:
         team_type_combo.pack()
 
         def search():
-            results = self.controller.search_by_position_team_type(
+            criteria = self.controller.position_team_type_criteria(
                 position=position_combo.get(), team_type=team_type_combo.get()
             )
             input_window.destroy()
-            self.create_results_window(results)
+            self.create_results_window(criteria)
 
         ttk.Button(input_window, text="Найти", command=search).pack(pady=5)
         ttk.Button(input_window, text="Закрыть", command=input_window.destroy).pack()
@@ -114,11 +123,11 @@ class SearchWindow:
         city_entry.pack()
 
         def search():
-            results = self.controller.search_by_team_city(
+            criteria = self.controller.team_city_criteria(
                 team=team_entry.get(), city=city_entry.get()
             )
             input_window.destroy()
-            self.create_results_window(results)
+            self.create_results_window(criteria)
 
         ttk.Button(input_window, text="Найти", command=search).pack(pady=5)
         ttk.Button(input_window, text="Закрыть", command=input_window.destroy).pack()
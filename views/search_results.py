@@ -1,6 +1,5 @@
 import tkinter as tk
-from tkinter import ttk
-from datetime import date
+from views.virtual_table import VirtualTable, PLAYER_COLUMNS, player_values
 
 
 class SearchResultsView:
@@ -9,33 +8,8 @@ class SearchResultsView:
         self.controller = controller
         self.controller.view = self
 
-        self.tree = ttk.Treeview(
-            root,
-            columns=(
-                "ФИО игрока",
-                "Дата рождения",
-                "Команда",
-                "Город",
-                "Состав",
-                "Позиция",
-            ),
-            show="headings",
-        )
-
-        columns = {
-            "ФИО игрока": 200,
-            "Дата рождения": 120,
-            "Команда": 150,
-            "Город": 120,
-            "Состав": 100,
-            "Позиция": 120,
-        }
-
-        for col, width in columns.items():
-            self.tree.heading(col, text=col)
-            self.tree.column(col, width=width, anchor="center")
-
-        self.tree.pack(expand=True, fill="both")
+        self.table = VirtualTable(root, PLAYER_COLUMNS)
+        self.table.pack(expand=True, fill="both")
 
         self.pagination_frame = tk.Frame(root)
         self.pagination_frame.pack(side="bottom", fill="x", pady=10)
@@ -77,21 +51,7 @@ class SearchResultsView:
         self.page_label.pack(side="left", padx=5)
 
     def update_table(self, players, current_page, total_pages, total_records):
-        self.tree.delete(*self.tree.get_children())
-
-        for player in players:
-            self.tree.insert(
-                "",
-                "end",
-                values=(
-                    player.full_name,
-                    player.birth_date.strftime("%d.%m.%Y"),
-                    player.football_team,
-                    player.home_city,
-                    player.team_type.value,
-                    player.position.value,
-                ),
-            )
+        self.table.set_rows([player_values(player) for player in players])
 
         self.update_pagination_controls(current_page, total_pages, total_records)
 
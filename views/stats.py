@@ -0,0 +1,64 @@
+import enum
+import tkinter as tk
+from tkinter import ttk
+from models.stats import STATS_SECTIONS
+
+SECTION_TITLES = {
+    "football_team": "Команды",
+    "position": "Позиции",
+    "team_type": "Составы",
+    "home_city": "Города",
+    "age": "Возраст",
+}
+
+
+class StatsWindow:
+    """Количество игроков по командам, позициям, составам, городам и возрасту"""
+
+    def __init__(self, gui):
+        self.gui = gui
+        self.controller = gui.controller
+
+    def show(self):
+        self.window = tk.Toplevel(self.gui.root)
+        self.window.title("Статистика")
+        self.window.geometry("500x450")
+
+        self.status_label = tk.Label(self.window, text="Загрузка...")
+        self.status_label.pack(pady=5)
+        self.notebook = ttk.Notebook(self.window)
+        self.notebook.pack(expand=True, fill="both", padx=10, pady=5)
+        ttk.Button(self.window, text="Закрыть", command=self.window.destroy).pack(
+            pady=5
+        )
+
+        self.controller.load_stats(self.fill)
+
+    @staticmethod
+    def label(value) -> str:
+        if value is None:
+            return "не указано"
+        if isinstance(value, enum.Enum):
+            return value.value
+        return str(value)
+
+    def fill(self, stats: dict):
+        if not self.window.winfo_exists():
+            return
+        self.status_label.config(text="")
+
+        for section in STATS_SECTIONS:
+            tree = ttk.Treeview(
+                self.notebook, columns=("value", "count"), show="headings"
+            )
+            tree.heading("value", text="Значение")
+            tree.heading("count", text="Количество")
+            tree.column("count", width=120, anchor="center")
+
+            counts = stats[section].items()
+            # Возрастные группы идут по порядку, остальное - по убыванию
+            if section != "age":
+                counts = sorted(counts, key=lambda item: item[1], reverse=True)
+            for value, count in counts:
+                tree.insert("", "end", values=(self.label(value), count))
+            self.notebook.add(tree, text=SECTION_TITLES[section])
@@ -0,0 +1,141 @@
+import tkinter as tk
+from tkinter import ttk
+
+# Колонки таблиц игроков и их ширина
+PLAYER_COLUMNS = {
+    "ФИО игрока": 250,
+    "Дата рождения": 120,
+    "Команда": 150,
+    "Город": 120,
+    "Состав": 100,
+    "Позиция": 120,
+}
+
+
+def player_values(player) -> tuple:
+    """Значения строки таблицы в порядке PLAYER_COLUMNS"""
+    return (
+        player.full_name,
+        player.birth_date.strftime("%d.%m.%Y"),
+        player.football_team or "",
+        player.home_city or "",
+        player.team_type.value if player.team_type else "",
+        player.position.value if player.position else "",
+    )
+
+
+class VirtualTable:
+    """Таблица, в которой создаются только видимые строки.
+
+    Элементы Treeview переиспользуются при прокрутке: меняются только их
+    значения, поэтому отрисовка не зависит от числа строк на странице.
+    """
+
+    # Строк сверх видимых, чтобы частично видимая снизу строка была заполнена
+    BUFFER = 2
+    DEFAULT_ROW_HEIGHT = 20
+    # Сколько строк показывать, пока окно ещё не получило размер
+    DEFAULT_VISIBLE_ROWS = 40
+    WHEEL_STEP = 3
+
+    def __init__(self, parent, columns: dict):
+        self.frame = tk.Frame(parent)
+        self.tree = ttk.Treeview(self.frame, columns=tuple(columns), show="headings")
+
+        for col, width in columns.items():
+            self.tree.heading(col, text=col)
+            self.tree.column(col, width=width, anchor="center")
+
+        self.scrollbar = ttk.Scrollbar(
+            self.frame, orient="vertical", command=self.on_scroll
+        )
+        self.scrollbar.pack(side="right", fill="y")
+        self.tree.pack(side="left", expand=True, fill="both")
+
+        self.rows = []
+        self.first = 0
+        self.items = []
+        # Значения, записанные в каждый элемент пула
+        self.shown = []
+
+        self.tree.bind("<Configure>", lambda event: self.refresh())
+        self.tree.bind("<MouseWheel>", self.on_mouse_wheel)
+        self.tree.bind("<Button-4>", self.on_mouse_wheel)
+        self.tree.bind("<Button-5>", self.on_mouse_wheel)
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    def pack_forget(self):
+        self.frame.pack_forget()
+
+    def set_rows(self, rows):
+        """Новые данные: список кортежей значений колонок"""
+        self.rows = rows
+        self.first = 0
+        self.refresh()
+
+    def replace_rows(self, rows):
+        """Новые данные без сброса прокрутки: перезаписываются изменённые строки"""
+        self.rows = rows
+        self.refresh()
+
+    def row_height(self) -> int:
+        height = ttk.Style().lookup("Treeview", "rowheight")
+        return int(height) if height else self.DEFAULT_ROW_HEIGHT
+
+    def visible_count(self) -> int:
+        height = self.tree.winfo_height()
+        if height <= 1:
+            return self.DEFAULT_VISIBLE_ROWS
+        # Одна строка уходит под заголовки колонок
+        return max(1, height // self.row_height() - 1)
+
+    def refresh(self):
+        visible = self.visible_count()
+        self.first = max(0, min(self.first, len(self.rows) - visible))
+        size = min(visible + self.BUFFER, len(self.rows) - self.first)
+
+        if len(self.items) > size:
+            self.tree.delete(*self.items[size:])
+            del self.items[size:]
+            del self.shown[size:]
+        while len(self.items) < size:
+            self.items.append(self.tree.insert("", "end"))
+            self.shown.append(None)
+
+        for offset, item in enumerate(self.items):
+            values = self.rows[self.first + offset]
+            if self.shown[offset] != values:
+                self.tree.item(item, values=values)
+                self.shown[offset] = values
+        self.tree.yview_moveto(0)
+        self.update_scrollbar(visible)
+
+    def update_scrollbar(self, visible: int):
+        total = len(self.rows)
+        if total <= visible:
+            self.scrollbar.set(0, 1)
+        else:
+            self.scrollbar.set(self.first / total, (self.first + visible) / total)
+
+    def scroll_to(self, first: int):
+        if first != self.first:
+            self.tree.selection_remove(self.tree.selection())
+            self.first = first
+            self.refresh()
+
+    def on_scroll(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to(int(float(amount) * len(self.rows)))
+        elif action == "scroll":
+            step = self.visible_count() if unit == "pages" else 1
+            self.scroll_to(self.first + int(amount) * step)
+
+    def on_mouse_wheel(self, event):
+        if event.num == 4 or event.delta > 0:
+            direction = -1
+        else:
+            direction = 1
+        self.scroll_to(max(0, self.first + direction * self.WHEEL_STEP))
+        return "break"